@@ -0,0 +1,498 @@
+"""
+IFCO Data Engineering Challenge — Dashboard Analytics
+=====================================================
+Data loading, global filters and the per-section computations behind the
+Executive Sales Dashboard. Pure pandas, no Streamlit or Plotly imports, so
+the same numbers can be produced by the live app and by headless jobs.
+"""
+
+import numpy as np
+import pandas as pd
+
+import sketches
+import snapshot
+
+# Commission rate by salesowner position (Main Owner, Co-owner 1, Co-owner 2),
+# as in the notebook's Test 4; later positions earn nothing
+COMMISSION_TIERS = (0.06, 0.025, 0.0095)
+NET_VALUE_TABLE = "gold_salesowner_position_net_value"
+
+# Order columns read by the sections and the data explorer; the raw
+# contact_data JSON and the ids of other tables are never loaded
+ORDER_COLUMNS = ["order_id", "date", "company_name", "crate_type", "contact_full_name",
+                 "contact_address", "salesowners"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 1. DATA LOADING
+# ─────────────────────────────────────────────────────────────────────────────
+def explode_owners(orders):
+    """
+    Narrow order × salesowner bridge: one row per (order, salesowner) with the
+    order's row position in ``orders`` (int32), the salesowner (categorical)
+    and its position in the list (downcast integer). Order attributes are not
+    copied; ``exploded_view`` gathers the ones a section needs.
+    """
+    owners = orders["salesowners"].astype(str).str.split(",")
+    counts = owners.str.len().to_numpy()
+    order_row = np.repeat(np.arange(len(orders), dtype=np.int32), counts)
+    # Position within the order: row number minus the order's first row
+    rank = np.arange(len(order_row)) - np.repeat(np.cumsum(counts) - counts, counts)
+    salesowner = owners.explode().str.strip().reset_index(drop=True)
+    return pd.DataFrame({
+        "order_row":  order_row,
+        "salesowner": salesowner.astype("category"),
+        "owner_rank": pd.to_numeric(rank, downcast="integer"),
+    })
+
+
+def exploded_view(orders, bridge, columns, mask=None):
+    """
+    ``salesowner`` plus the order ``columns`` for the bridge rows whose order
+    is selected by ``mask`` (a boolean array over ``orders``, default all).
+    Columns are gathered by row position: values are shared, not copied.
+    """
+    rows = bridge["order_row"].to_numpy()
+    owner_codes = bridge["salesowner"].cat.codes.to_numpy()
+    if mask is not None:
+        keep = mask[rows]
+        rows, owner_codes = rows[keep], owner_codes[keep]
+    view = {"salesowner": bridge["salesowner"].cat.categories.to_numpy()[owner_codes]}
+    view.update({c: orders[c].to_numpy()[rows] for c in columns})
+    return pd.DataFrame(view)
+
+
+def load_static(data_dir):
+    """Gold/Silver tables that are small enough to always load in full."""
+    return {
+        "crate_dist":  snapshot.read_table(data_dir, "gold_crate_distribution"),
+        "commissions": snapshot.read_table(data_dir, "gold_sales_commissions"),
+        "companies":   snapshot.read_table(data_dir, "gold_companies_salesowners"),
+        "invoicing":   snapshot.read_table(data_dir, "silver_invoicing"),
+        "order_stats": snapshot.table_stats(data_dir, "silver_orders"),
+        "version":     snapshot.version_id(data_dir),
+    }
+
+
+def load_owner_roles(data_dir):
+    """All-time orders per salesowner and position (Main Owner / Co-owner N)."""
+    if snapshot.has_table(data_dir, "gold_salesowner_roles"):
+        return snapshot.read_table(data_dir, "gold_salesowner_roles")
+    # Legacy CSV snapshots predate the roles table: derive it from every order
+    bridge = explode_owners(snapshot.read_table(data_dir, "silver_orders"))
+    return (bridge.groupby(["salesowner", "owner_rank"], observed=True).size()
+            .reset_index(name="orders").astype({"salesowner": str}))
+
+
+def net_value_by_position(orders, invoicing):
+    """
+    Net value (cents) and orders per salesowner, position and order month,
+    like the notebook's ``calculate_net_value_by_position``.
+    """
+    joined = orders[["order_id", "date", "salesowners"]].merge(
+        invoicing[["orderId", "grossValue", "vat"]], left_on="order_id", right_on="orderId")
+    exploded = (joined.assign(salesowner_name=joined["salesowners"].astype(str).str.split(","))
+                .explode("salesowner_name"))
+    exploded["position"] = exploded.groupby(level=0).cumcount()
+    exploded["salesowner_name"] = exploded["salesowner_name"].str.strip()
+    exploded["order_month"] = exploded["date"].dt.strftime("%Y-%m")
+    exploded["net_value_cents"] = exploded["grossValue"] / (1 + exploded["vat"] / 100)
+    return (exploded.groupby(["salesowner_name", "position", "order_month"], dropna=False)
+            .agg(net_value_cents=("net_value_cents", "sum"), orders=("order_id", "size"))
+            .reset_index())
+
+
+def load_net_value_by_position(data_dir):
+    """Net value per salesowner × position × month, the input of the what-if tiers."""
+    if snapshot.has_table(data_dir, NET_VALUE_TABLE):
+        return snapshot.read_table(data_dir, NET_VALUE_TABLE)
+    # Older snapshots predate the aggregate: derive it from every dated order
+    stats = snapshot.table_stats(data_dir, "silver_orders")
+    orders = snapshot.load_range(data_dir, "silver_orders", stats["min_date"], stats["max_date"],
+                                 parse_dates=["date"])
+    return net_value_by_position(orders, snapshot.read_table(data_dir, "silver_invoicing"))
+
+
+def load_sketches(data_dir):
+    """
+    HyperLogLog sketches of the distinct orders per salesowner × month × crate
+    type, with their precision and relative standard error.
+    """
+    if snapshot.has_table(data_dir, sketches.TABLE):
+        precision = snapshot.read_manifest(data_dir)["tables"][sketches.TABLE]["hll_precision"]
+        sketch = sketches.from_table(snapshot.read_table(data_dir, sketches.TABLE), precision)
+    else:
+        # Legacy CSV snapshots predate the sketches: build them from every order
+        precision = sketches.DEFAULT_PRECISION
+        orders = snapshot.read_table(data_dir, "silver_orders", parse_dates=["date"])
+        sketch = sketches.build(exploded_view(orders, explode_owners(orders),
+                                              ["order_id", "date", "crate_type"]), precision)
+    # Shared across sessions and threads by the dashboard and the API
+    sketch["registers"].setflags(write=False)
+    return {**sketch, "precision": precision, "rel_error": sketches.relative_error(precision)}
+
+
+def load_orders(data_dir, start, end):
+    """
+    Orders (``ORDER_COLUMNS`` only) from the month partitions overlapping
+    [start, end], and their salesowner bridge (see ``explode_owners``).
+    """
+    orders = snapshot.load_range(data_dir, "silver_orders", start, end, parse_dates=["date"],
+                                 columns=ORDER_COLUMNS)
+    return orders, explode_owners(orders)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 2. GLOBAL FILTERS
+# ─────────────────────────────────────────────────────────────────────────────
+def default_filters(order_stats):
+    """Sidebar defaults: every crate type over the whole order history."""
+    return order_stats["crate_types"], order_stats["min_date"], order_stats["max_date"]
+
+
+def load_window(d_start, d_end, approximate=False):
+    """
+    Range of order dates to load for [d_start, d_end]: the range itself plus
+    the lookbacks of Section B (12 months before the end date) and Section C
+    (2 months before the first rolling window). In approximate mode Sections
+    B and C read the sketches instead, so only the range itself is loaded.
+    """
+    if approximate:
+        return d_start, d_end
+    cutoff_12m = d_end - pd.DateOffset(months=12)
+    load_start = min(cutoff_12m, d_start.to_period("M").start_time - pd.DateOffset(months=2))
+    return load_start, d_end
+
+
+def apply_filters(orders, bridge, sel_crates, d_start, d_end):
+    """
+    Slice the loaded orders into the frames every section reads. Masks are
+    computed once per order; the exploded frames only carry the columns
+    their section reads. Slices are never modified, so none is copied.
+    """
+    is_plastic = (orders["crate_type"] == "Plastic").to_numpy()
+    in_range   = orders["date"].between(d_start, d_end).to_numpy()
+    selected   = orders["crate_type"].isin(sel_crates).to_numpy() & in_range
+
+    filt_orders  = orders[selected]
+    filt_exp     = exploded_view(orders, bridge, [], selected)
+    filt_plastic = orders[is_plastic & in_range]
+    plastic_exp  = exploded_view(orders, bridge, ["order_id", "date"], is_plastic)
+
+    cutoff_12m = d_end - pd.DateOffset(months=12)
+    last12_exp = exploded_view(orders, bridge, ["order_id", "crate_type"],
+                               orders["date"].between(cutoff_12m, d_end).to_numpy())
+
+    # GUARANTEE a perfectly continuous timeline from the first to the last month of the selected range.
+    # If we only use unique() dates from plastic_exp, any month where ZERO plastic crates
+    # were sold company-wide will be skipped in the loop, breaking the rolling sum and causing false 0s.
+    all_months = pd.period_range(
+        start=d_start.to_period("M"),
+        end=d_end.to_period("M"),
+        freq="M"
+    )
+
+    return {
+        "filt_orders":  filt_orders,
+        "filt_exp":     filt_exp,
+        "filt_plastic": filt_plastic,
+        "plastic_exp":  plastic_exp,
+        "last12_exp":   last12_exp,
+        "all_months":   all_months,
+        "d_end":        d_end,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 3. SECTION COMPUTATIONS
+# ─────────────────────────────────────────────────────────────────────────────
+def kpis(view, commissions, owner_roles):
+    """
+    Headline KPIs of the selected view. Commissions and active salesowners are
+    all-time (the latter from the roles table, with the range count alongside).
+    """
+    total_orders  = len(view["filt_orders"])
+    total_plastic = len(view["filt_plastic"])
+    return {
+        "total_orders":     total_orders,
+        "plastic_pct":      total_plastic / total_orders * 100 if total_orders else 0,
+        "total_commission": commissions["commission_euros"].sum(),
+        "active_owners":    owner_roles["salesowner"].nunique(),
+        "range_owners":     view["filt_exp"]["salesowner"].nunique(),
+        "active_companies": view["filt_orders"]["company_name"].nunique(),
+    }
+
+
+def crate_distribution(filt_orders, crate_dist):
+    """Section A — overall split, monthly counts and the top-20 company heatmap."""
+    overall = filt_orders["crate_type"].value_counts().reset_index()
+    overall.columns = ["crate_type", "count"]
+
+    month = filt_orders["date"].dt.to_period("M").astype(str).rename("month")
+    monthly_cnt = filt_orders.groupby([month, "crate_type"]).size().reset_index(name="count")
+
+    return {"overall": overall, "monthly_cnt": monthly_cnt, "pivot": top_company_pivot(crate_dist)}
+
+
+def top_company_pivot(crate_dist, top=20):
+    """Company × crate type matrix of the ``top`` companies with the most crates."""
+    pivot = crate_dist.pivot_table(index="company_name", columns="crate_type",
+                                   values="total_crates", fill_value=0)
+    # Ties are broken by company name, as in the DuckDB query
+    totals = pivot.sum(axis=1).sort_index()
+    return pivot.loc[totals.sort_values(ascending=False, kind="stable").head(top).index]
+
+
+def training_table(total_per_owner, plastic_per_owner):
+    """Section B table from distinct total / plastic orders per salesowner."""
+    training_df = pd.DataFrame({"total": total_per_owner, "plastic": plastic_per_owner}).fillna(0)
+    training_df["non_plastic"]  = training_df["total"] - training_df["plastic"]
+    training_df["plastic_rate"] = training_df["plastic"] / training_df["total"] * 100
+    return training_df[training_df["total"] >= 1].sort_values("plastic_rate").reset_index()
+
+
+def training_needs(last12_exp):
+    """Section B — plastic conversion rate per salesowner, lowest first."""
+    total_per_owner   = last12_exp.groupby("salesowner")["order_id"].nunique().rename("total")
+    plastic_per_owner = (
+        last12_exp[last12_exp["crate_type"] == "Plastic"]
+        .groupby("salesowner")["order_id"].nunique().rename("plastic")
+    )
+    return training_table(total_per_owner, plastic_per_owner)
+
+
+def training_needs_approx(sketch, d_end):
+    """
+    Section B from merged sketches, over the 12 calendar months ending with
+    the month of ``d_end``.
+    """
+    months = pd.period_range(end=d_end.to_period("M"), periods=12, freq="M").astype(str)
+    keys = sketch["keys"]
+    in_months = keys["order_month"].isin(months)
+    total_per_owner = sketches.estimate(sketches.select(sketch, in_months), ["salesowner"],
+                                        sketch["precision"]).round().astype(int)
+    plastic_per_owner = sketches.estimate(
+        sketches.select(sketch, in_months & (keys["crate_type"] == "Plastic")), ["salesowner"],
+        sketch["precision"]).round().astype(int)
+    # Independent estimates: a sub-count must not exceed its total
+    plastic_per_owner = plastic_per_owner.clip(upper=total_per_owner.reindex(plastic_per_owner.index))
+    return training_table(total_per_owner.rename("total"), plastic_per_owner.rename("plastic"))
+
+
+def rolling_top5(plastic_exp, all_months):
+    """Section C — rolling 3-month plastic orders, dense rank and top 5 per month."""
+    year_month = plastic_exp["date"].dt.to_period("M")
+
+    def window_counts(month):
+        mask = (year_month >= month - 2) & (year_month <= month)
+        return plastic_exp[mask].groupby("salesowner")["order_id"].nunique()
+
+    return rank_rolling(window_counts, all_months)
+
+
+def rolling_top5_approx(sketch, all_months):
+    """Section C from the plastic sketches of each rolling 3-month window."""
+    plastic = sketches.select(sketch, sketch["keys"]["crate_type"] == "Plastic")
+
+    def window_counts(month):
+        in_window = plastic["keys"]["order_month"].isin([str(month - k) for k in range(3)])
+        return sketches.estimate(sketches.select(plastic, in_window), ["salesowner"],
+                                 sketch["precision"]).round().astype(int)
+
+    return rank_rolling(window_counts, all_months)
+
+
+def rank_rolling(window_counts, all_months):
+    """
+    Section C ranking and heatmap from ``window_counts(month)``, the plastic
+    orders per salesowner of the 3-month window ending in ``month``.
+    """
+    # Calculate rolling 3-month performance for all owners
+    all_rolling_rows = []
+    for month in all_months:
+        counts = window_counts(month).rename_axis("salesowner").reset_index(name="plastic_orders")
+
+        # Sort descending by orders, ascending by name to break ties predictably
+        counts = counts.sort_values(["plastic_orders", "salesowner"], ascending=[False, True])
+
+        # Calculate mathematics rank: dense assigns consecutive numbers.
+        # Ex: 1st=10 boxes, 2nd=10 boxes, 3rd=9 boxes -> Ranks: 1, 1, 2.
+        # Thus, a "second best seller" is ALWAYS firmly on line 2, never pushed down.
+        counts["rank"] = counts["plastic_orders"].rank(method="dense", ascending=False).astype(int)
+        counts["rank_display"] = counts["rank"]
+
+        counts["month"] = str(month)
+        all_rolling_rows.append(counts)
+
+    full_rolling_df = pd.concat(all_rolling_rows, ignore_index=True)
+
+    # Cutoff exactly at geometric rank=5 to enforce exactly 5 owners plotted per month
+    rolling_df = full_rolling_df[full_rolling_df["rank"] <= 5].copy()
+
+    # The people who EVER hit Top 5:
+    all_top_owners = sorted(rolling_df["salesowner"].unique())
+
+    # For the heatmap, get their FULL history (showing true orders even when not in top 5)
+    heatmap_data = full_rolling_df[full_rolling_df["salesowner"].isin(all_top_owners)].copy()
+
+    # Pivot: rows=month, cols=owner (fill 0 if they genuinely had no orders)
+    pivot_full = heatmap_data.pivot_table(
+        index="month", columns="salesowner", values="plastic_orders", fill_value=0
+    )
+    all_months_str = [str(m) for m in all_months]
+    pivot_full = pivot_full.reindex(all_months_str, fill_value=0)
+
+    # A range can hold orders but no plastic ones: no window is ranked then
+    latest_month = max(rolling_df["month"], default=None)
+    top5_latest = rolling_df[rolling_df["month"] == latest_month].sort_values("rank")
+
+    return {
+        "rolling_df":     rolling_df,
+        "all_top_owners": all_top_owners,
+        "all_months_str": all_months_str,
+        "pivot_full":     pivot_full,
+        "latest_month":   latest_month,
+        "top5_latest":    top5_latest,
+    }
+
+
+def commission_per_order(commissions, owner_roles):
+    """Section D — commission per order and its deviation from the mean."""
+    orders_per_owner = owner_roles.groupby("salesowner")["orders"].sum().reset_index(name="total_orders")
+    comm_merged = pd.merge(commissions, orders_per_owner, left_on="salesowner_name", right_on="salesowner", how="left")
+    comm_merged["commission_per_order"] = comm_merged["commission_euros"] / comm_merged["total_orders"]
+    mean_cpo = comm_merged["commission_per_order"].mean()
+    comm_merged["cpo_deviation"] = comm_merged["commission_per_order"] - mean_cpo
+    return cpo_labels(comm_merged, mean_cpo)
+
+
+def cpo_labels(comm_merged, mean_cpo):
+    """Section D result with the chart labels of the commission per order."""
+    # Pre-format exact string labels to avoid Plotly number formatting bugs
+    comm_merged["cpo_text"] = comm_merged["commission_per_order"].apply(lambda x: f"€{x:,.2f}")
+    comm_merged["dev_text"] = comm_merged["cpo_deviation"].apply(lambda x: f"{x:+.2f}€")
+    return {"comm_merged": comm_merged, "mean_cpo": mean_cpo}
+
+
+def position_net_values(net_by_position, months=None):
+    """
+    Net value (cents) per salesowner and position, summed over ``months``
+    ('YYYY-MM' strings, default all). The what-if tiers only need this.
+    """
+    if months is not None:
+        net_by_position = net_by_position[net_by_position["order_month"].isin(months)]
+    return net_by_position.groupby(["salesowner_name", "position"])["net_value_cents"].sum()
+
+
+def simulate_commissions(position_net, tiers):
+    """
+    Section D what-if — commission per salesowner under the current tiers and
+    under ``tiers`` (rate per position, 0 beyond the last). Commissions are
+    linear in net value, so this costs O(salesowners × positions).
+    """
+    positions = position_net.index.get_level_values("position")
+
+    def euros(rates):
+        rate = pd.Series(rates, dtype="float64").reindex(positions, fill_value=0.0).to_numpy()
+        return (position_net * rate).groupby(level="salesowner_name").sum().div(100).round(2)
+
+    sim = pd.DataFrame({"current_euros": euros(COMMISSION_TIERS), "what_if_euros": euros(tiers)})
+    sim["delta_euros"] = sim["what_if_euros"] - sim["current_euros"]
+    return sim.sort_values("what_if_euros", ascending=False).reset_index()
+
+
+def role_distribution(owner_roles):
+    """Section D — share of orders as Main Owner vs Co-owner N per salesowner."""
+    # Create dynamic roles based on max roles
+    max_co_owners = owner_roles["owner_rank"].max()
+    role_map = {0: "Main Owner"}
+    for i in range(1, max_co_owners + 1):
+        role_map[i] = f"Co-owner {i}"
+
+    role = owner_roles["owner_rank"].map(role_map).rename("role")
+
+    # Calculate exactly 100% per person
+    role_counts = owner_roles.groupby(["salesowner", role])["orders"].sum().reset_index(name="count")
+    totals = role_counts.groupby("salesowner")["count"].sum().reset_index(name="total")
+    role_pcts = pd.merge(role_counts, totals, on="salesowner")
+    role_pcts["pct"] = (role_pcts["count"] / role_pcts["total"]) * 100
+
+    # Sort owners by their % as Main Owner (for ordering the Y axis)
+    # Reversing the order so highest Main Owner % is at the top of the chart
+    main_data = role_pcts[role_pcts["role"] == "Main Owner"]
+    main_order = main_data.sort_values("pct", ascending=True)["salesowner"].tolist()
+
+    # Category order: Main Owner first, then Co-owner 1 -> Co-owner N
+    # This places Main Owner anchored to the left side (0%) of the bar.
+    category_roles = ["Main Owner"] + [f"Co-owner {i}" for i in range(1, max_co_owners + 1)]
+    return {"role_map": role_map, "role_pcts": role_pcts,
+            "main_order": main_order, "category_roles": category_roles}
+
+
+def company_portfolio(companies, filt_orders):
+    """Section E — companies by number of salesowners and top cities."""
+    companies = companies.assign(n_owners=companies["list_salesowners"].apply(
+        lambda x: len(str(x).split(",")) if pd.notna(x) else 0
+    ))
+    top_co = companies.sort_values("n_owners", ascending=False).head(20)
+
+    city_data   = filt_orders["contact_address"].dropna()
+    city_counts = (city_data[~city_data.str.startswith("Unknown")]
+                   .apply(lambda x: x.split(",")[0].strip())
+                   .value_counts().reset_index())
+    city_counts.columns = ["city", "orders"]
+    return {"top_co": top_co, "city_counts": city_counts}
+
+
+def order_trends(filt_orders):
+    """Section F — quarterly volume and calendar-month seasonality by crate type."""
+    date = filt_orders["date"]
+    year_q = (date.dt.year.astype(str) + " Q" + date.dt.quarter.astype(str)).rename("year_q")
+    yoy = (filt_orders.groupby([year_q, "crate_type"])
+           .size().reset_index(name="count").sort_values("year_q"))
+
+    calendar_month = date.dt.month.rename("calendar_month")
+    month_name     = date.dt.strftime("%b").rename("month_name")
+    seasonality = (filt_orders.groupby([calendar_month, month_name, "crate_type"])
+                   .size().reset_index(name="count").sort_values("calendar_month"))
+    return {"yoy": yoy, "seasonality": seasonality}
+
+
+def compute_sections(view, static, owner_roles, sketch=None):
+    """
+    Every section's data for one filtered view, keyed by section. With
+    ``sketch`` (see ``load_sketches``) Sections B and C use approximate
+    distinct counts merged from HyperLogLog sketches.
+    """
+    if sketch is None:
+        b = training_needs(view["last12_exp"])
+        c = rolling_top5(view["plastic_exp"], view["all_months"])
+    else:
+        b = training_needs_approx(sketch, view["d_end"])
+        c = rolling_top5_approx(sketch, view["all_months"])
+    return {
+        "kpis":  kpis(view, static["commissions"], owner_roles),
+        "a":     crate_distribution(view["filt_orders"], static["crate_dist"]),
+        "b":     b,
+        "c":     c,
+        "d_cpo": commission_per_order(static["commissions"], owner_roles),
+        "d_roles": role_distribution(owner_roles),
+        "e":     company_portfolio(static["companies"], view["filt_orders"]),
+        "f":     order_trends(view["filt_orders"]),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 4. MEMORY BUDGET
+# ─────────────────────────────────────────────────────────────────────────────
+def frame_memory(frames):
+    """
+    Rows, columns and deep memory (MB) of each named frame or series, largest
+    first. Strings are counted in every frame that references them, so shared
+    values make this an upper bound.
+    """
+    rows = [{"frame": name, "rows": len(df), "columns": 1 if df.ndim == 1 else df.shape[1],
+             "mb": np.sum(df.memory_usage(index=True, deep=True)) / 2**20}
+            for name, df in frames.items()]
+    return pd.DataFrame(rows, columns=["frame", "rows", "columns", "mb"]).sort_values(
+        "mb", ascending=False, ignore_index=True)
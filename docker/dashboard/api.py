@@ -0,0 +1,383 @@
+"""
+IFCO Data Engineering Challenge — Read-Only Aggregates API
+==========================================================
+HTTP/JSON service for BI tools and other machine clients that need the
+numbers the dashboard shows, without scraping the exported CSVs or loading
+Streamlit. Sections are computed by the dashboard's own code (``queries``,
+or ``analytics`` without DuckDB) over the same snapshot.
+
+    GET /api/v1/snapshot              version, crate types and date bounds
+    GET /api/v1/crate-distribution    Section A
+    GET /api/v1/commissions           Section D (all-time, filters do not apply)
+    GET /api/v1/companies             Section E: companies and their salesowners
+    GET /api/v1/rolling-top5          Section C
+
+Filters match the sidebar: ``crates`` (comma-separated, default all),
+``start`` / ``end`` (ISO dates, default the full order history, clamped to
+it) and, for ``rolling-top5``, ``approximate=true`` for HyperLogLog counts.
+
+Responses are cached per snapshot version and normalised filters, computed
+once even when many clients ask at the same time, and gzip-compressed once.
+Their ETag is derived from the snapshot version, the dashboard code version
+and the filters, so a client polling with ``If-None-Match`` gets ``304 Not
+Modified`` without any computation until a new snapshot or code is deployed.
+
+Usage:
+    python dashboard/api.py [--data-dir DIR] [--host HOST] [--port PORT] [--access-log]
+"""
+
+import argparse
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import analytics
+import queries
+import snapshot
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, "data")
+CACHE_SIZE = int(os.environ.get("IFCO_API_CACHE_SIZE", "256"))   # cached responses
+MAX_AGE = int(os.environ.get("IFCO_API_MAX_AGE", "60"))          # seconds clients may reuse a response
+GZIP_MIN_BYTES = 1024
+
+logger = logging.getLogger(__name__)
+
+
+class BadRequest(ValueError):
+    """Invalid filter parameters, answered with 400."""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 1. FILTERS
+# ─────────────────────────────────────────────────────────────────────────────
+def _flag(value):
+    if value.lower() in ("1", "true", "yes"):
+        return True
+    if value.lower() in ("0", "false", "no", ""):
+        return False
+    raise BadRequest(f"expected true or false, got {value!r}")
+
+
+def _date(name, value, default):
+    if not value:
+        return default
+    try:
+        return pd.Timestamp(value).normalize()
+    except ValueError:
+        raise BadRequest(f"{name} must be an ISO date (YYYY-MM-DD), got {value!r}") from None
+
+
+def parse_filters(qs, order_stats):
+    """
+    Normalised filters of a query string: equivalent requests (crates in
+    another order, dates outside the history) map to the same filters, and
+    so to the same cache entry and ETag.
+    """
+    all_crates, min_ts, max_ts = analytics.default_filters(order_stats)
+    crates = [c.strip() for v in qs.get("crates", []) for c in v.split(",") if c.strip()]
+    unknown = sorted(set(crates) - set(all_crates))
+    if unknown:
+        raise BadRequest(f"unknown crate types {unknown}; expected some of {list(all_crates)}")
+
+    d_start = max(_date("start", qs.get("start", [""])[-1], min_ts.normalize()), min_ts.normalize())
+    d_end = min(_date("end", qs.get("end", [""])[-1], max_ts.normalize()), max_ts.normalize())
+    if d_start > d_end:
+        raise BadRequest("start must not be after end")
+    return {
+        "crates":      sorted(set(crates)) if crates else list(all_crates),
+        "start":       d_start,
+        "end":         d_end,
+        "approximate": _flag(qs.get("approximate", [""])[-1]),
+    }
+
+
+def _filters_json(filters):
+    return {**filters, "start": filters["start"].date().isoformat(),
+            "end": filters["end"].date().isoformat()}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 2. PAYLOADS
+# ─────────────────────────────────────────────────────────────────────────────
+def _records(df):
+    # pandas' own serialiser: NaN -> null, numpy scalars and dates handled
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+def _orders_view(data_dir, filters):
+    # Loaded frames of the pandas engine (the DuckDB engine queries the files)
+    orders, bridge = analytics.load_orders(
+        data_dir, *analytics.load_window(filters["start"], filters["end"]))
+    return analytics.apply_filters(orders, bridge, filters["crates"],
+                                   filters["start"], filters["end"])
+
+
+@functools.lru_cache(maxsize=2)
+def _load_sketches(data_dir, version):
+    # Shared by every approximate request of a snapshot version
+    return analytics.load_sketches(data_dir)
+
+
+def snapshot_info(data_dir, filters):
+    stats = snapshot.table_stats(data_dir, "silver_orders")
+    return {
+        "version":     snapshot.version_id(data_dir),
+        "crate_types": list(stats["crate_types"]),
+        "min_date":    stats["min_date"].date().isoformat(),
+        "max_date":    stats["max_date"].date().isoformat(),
+        "engine":      queries.ENGINE,
+    }
+
+
+def crate_distribution(data_dir, filters):
+    if queries.ENGINE == "duckdb":
+        params = queries.filter_params(filters["crates"], filters["start"], filters["end"])
+        a = queries.crate_distribution(data_dir, params)
+    else:
+        crate_dist = snapshot.read_table(data_dir, "gold_crate_distribution")
+        a = analytics.crate_distribution(_orders_view(data_dir, filters)["filt_orders"], crate_dist)
+    return {
+        "overall":       _records(a["overall"]),
+        "monthly":       _records(a["monthly_cnt"]),
+        "top_companies": _records(a["pivot"].reset_index()),
+    }
+
+
+def commissions(data_dir, filters):
+    if queries.ENGINE == "duckdb":
+        d = queries.commission_per_order(data_dir)
+    else:
+        d = analytics.commission_per_order(snapshot.read_table(data_dir, "gold_sales_commissions"),
+                                           analytics.load_owner_roles(data_dir))
+    comm = d["comm_merged"].drop(columns=["salesowner", "cpo_text", "dev_text"])
+    return {"commissions": _records(comm), "mean_commission_per_order": d["mean_cpo"]}
+
+
+def companies(data_dir, filters):
+    companies = snapshot.read_table(data_dir, "gold_companies_salesowners")
+    if queries.ENGINE == "duckdb":
+        params = queries.filter_params(filters["crates"], filters["start"], filters["end"])
+        e = queries.company_portfolio(data_dir, params)
+    else:
+        e = analytics.company_portfolio(companies, _orders_view(data_dir, filters)["filt_orders"])
+    return {
+        "companies":          _records(companies),
+        "top_by_salesowners": _records(e["top_co"][["company_id", "company_name", "n_owners"]]),
+        "cities":             _records(e["city_counts"]),
+    }
+
+
+def rolling_top5(data_dir, filters):
+    all_months = pd.period_range(start=filters["start"].to_period("M"),
+                                 end=filters["end"].to_period("M"), freq="M")
+    sketch = _load_sketches(data_dir, snapshot.version_id(data_dir)) if filters["approximate"] else None
+    if sketch is not None:
+        c = analytics.rolling_top5_approx(sketch, all_months)
+    elif queries.ENGINE == "duckdb":
+        params = queries.filter_params(filters["crates"], filters["start"], filters["end"])
+        c = queries.rolling_top5(data_dir, params, all_months)
+    else:
+        c = analytics.rolling_top5(_orders_view(data_dir, filters)["plastic_exp"], all_months)
+    columns = ["month", "rank", "salesowner", "plastic_orders"]
+    payload = {
+        "latest_month": c["latest_month"],
+        "top5_latest":  _records(c["top5_latest"][columns]),
+        "ranking":      _records(c["rolling_df"][columns]),
+    }
+    if sketch is not None:
+        payload["relative_error"] = sketch["rel_error"]
+    return payload
+
+
+# Endpoint -> (payload function, filter keys it depends on). Keys outside the
+# list are dropped before caching, so e.g. commissions are computed once.
+ENDPOINTS = {
+    "/api/v1/snapshot":           (snapshot_info, []),
+    "/api/v1/crate-distribution": (crate_distribution, ["crates", "start", "end"]),
+    "/api/v1/commissions":        (commissions, []),
+    "/api/v1/companies":          (companies, ["crates", "start", "end"]),
+    # Section C is plastic-only: the crate filter does not change it
+    "/api/v1/rolling-top5":       (rolling_top5, ["start", "end", "approximate"]),
+}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 3. RESPONSE CACHE
+# ─────────────────────────────────────────────────────────────────────────────
+class ResponseCache:
+    """
+    LRU of encoded responses keyed by (snapshot version, endpoint, filters).
+    Concurrent misses on one key compute it once; the others wait for it.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            pending = self._pending.setdefault(key, threading.Lock())
+        with pending:
+            with self._lock:
+                if key in self._entries:
+                    return self._entries[key]
+            try:
+                entry = compute()
+                with self._lock:
+                    self._entries[key] = entry
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+            finally:
+                # Also on failure: waiting requests then compute it themselves
+                with self._lock:
+                    if self._pending.get(key) is pending:
+                        del self._pending[key]
+        return entry
+
+
+def encode(payload):
+    """JSON body of a payload, and its gzip encoding when worth sending."""
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    gzipped = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+    return {"body": body, "gzip": gzipped}
+
+
+def etag(version, path, filters):
+    # Weak: the identity and gzip encodings of a response share it. The code
+    # version is part of it, so clients revalidate after a deploy too.
+    digest = hashlib.sha1(json.dumps([path, filters], sort_keys=True).encode()).hexdigest()[:16]
+    return f'W/"{version}-{snapshot.code_version()}-{digest}"'
+
+
+def _accepts_gzip(header):
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _etag_matches(header, tag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 §8.8.3.2): the opaque tags must match
+    opaque = tag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == opaque for t in header.split(","))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 4. HTTP SERVER
+# ─────────────────────────────────────────────────────────────────────────────
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive for polling clients
+    server_version = "IFCO-API/1"
+    access_log = False
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        url = urlsplit(self.path)
+        if url.path not in ENDPOINTS:
+            return self._send_error(HTTPStatus.NOT_FOUND, f"unknown endpoint {url.path}", head)
+        payload_fn, keys = ENDPOINTS[url.path]
+
+        try:
+            # Legacy CSVs are served from their Parquet conversion when one exists;
+            # resolved per request so a newly published snapshot is picked up
+            data_dir = snapshot.resolve_data_dir(self.server.data_dir)
+            version = snapshot.version_id(data_dir)
+            order_stats = self.server.cache.get(
+                (version, "order_stats"), lambda: snapshot.table_stats(data_dir, "silver_orders"))
+            filters = parse_filters(parse_qs(url.query), order_stats)
+        except BadRequest as exc:
+            return self._send_error(HTTPStatus.BAD_REQUEST, str(exc), head)
+        except Exception:
+            return self._send_internal_error(head)
+        # Only the filters the endpoint depends on key its cache entry and ETag
+        filters_json = {k: v for k, v in _filters_json(filters).items() if k in keys}
+
+        tag = etag(version, url.path, filters_json)
+        headers = {"ETag": tag, "Cache-Control": f"public, max-age={MAX_AGE}",
+                   "Vary": "Accept-Encoding"}
+        if _etag_matches(self.headers.get("If-None-Match"), tag):
+            return self._send(HTTPStatus.NOT_MODIFIED, None, headers, head=True)
+
+        try:
+            entry = self.server.cache.get(
+                (version, url.path, json.dumps(filters_json, sort_keys=True)),
+                lambda: encode({"snapshot": version, "filters": filters_json,
+                                **payload_fn(data_dir, filters)}),
+            )
+        except Exception:
+            return self._send_internal_error(head)
+        if entry["gzip"] is not None and _accepts_gzip(self.headers.get("Accept-Encoding")):
+            headers["Content-Encoding"] = "gzip"
+            return self._send(HTTPStatus.OK, entry["gzip"], headers, head)
+        return self._send(HTTPStatus.OK, entry["body"], headers, head)
+
+    def _send(self, status, body, headers, head=False):
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body is not None and not head:
+            self.wfile.write(body)
+
+    def _send_error(self, status, message, head=False):
+        body = json.dumps({"error": message}).encode("utf-8")
+        self._send(status, body, {"Cache-Control": "no-store"}, head)
+
+    def _send_internal_error(self, head=False):
+        # Failed computations are not cached: the next request retries them
+        logger.exception("%s %s failed", self.command, self.path)
+        self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, "internal error computing the response", head)
+
+    def log_message(self, format, *args):
+        if self.access_log:
+            super().log_message(format, *args)
+
+
+def make_server(host="0.0.0.0", port=8000, data_dir=DATA_DIR, access_log=False):
+    """HTTP server answering each request on its own thread, sharing one response cache."""
+    handler = type("Handler", (ApiHandler,), {"access_log": access_log})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.data_dir = data_dir
+    server.cache = ResponseCache()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the dashboard aggregates as a read-only JSON API.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Snapshot directory (default: dashboard/data)")
+    parser.add_argument("--host", default="0.0.0.0", help="Bind address (default: 0.0.0.0)")
+    parser.add_argument("--port", type=int, default=8000, help="Port (default: 8000)")
+    parser.add_argument("--access-log", action="store_true", help="Log every request to stderr")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.data_dir, args.access_log)
+    print(f"Serving {', '.join(ENDPOINTS)} on http://{args.host}:{args.port} "
+          f"({queries.ENGINE} engine)", flush=True)
+    server.serve_forever()
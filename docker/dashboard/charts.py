@@ -0,0 +1,441 @@
+"""
+IFCO Data Engineering Challenge — Dashboard Figures
+===================================================
+One builder per Plotly figure of the Executive Sales Dashboard. Builders
+take the frames produced by ``analytics`` and return styled figures, so the
+live app and the static report render exactly the same charts.
+"""
+
+import plotly.express as px
+import plotly.graph_objects as go
+
+from theme import BG, GRID, TEXT, CRATE_COLORS, dark, register_template
+
+register_template()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SECTION A — CRATE TYPE DISTRIBUTION
+# ─────────────────────────────────────────────────────────────────────────────
+def fig_pie(overall):
+    fig = px.pie(
+        overall, values="count", names="crate_type",
+        color="crate_type", color_discrete_map=CRATE_COLORS,
+        hole=0.55, title="Overall Crate Type Split"
+    )
+    fig.update_traces(
+        textinfo="percent+label",
+        textfont=dict(color=TEXT, size=13),
+        pull=[0.03] * len(overall),
+        marker=dict(line=dict(color="#0d1117", width=2))
+    )
+    dark(fig, legend_h=True, margin=dict(t=55, b=55, l=20, r=20))
+    return fig
+
+
+def fig_bar(monthly_cnt):
+    fig = px.bar(
+        monthly_cnt, x="month", y="count", color="crate_type",
+        color_discrete_map=CRATE_COLORS,
+        barmode="stack",
+        title="Monthly Orders by Crate Type",
+        labels={"month": "", "count": "Orders", "crate_type": "Type"}
+    )
+    dark(fig, legend_h=True, margin=dict(t=55, b=65, l=50, r=20))
+    fig.update_xaxes(tickangle=-45)
+    return fig
+
+
+def fig_heat_companies(pivot):
+    fig = px.imshow(
+        pivot, text_auto=True, aspect="auto",
+        color_continuous_scale="Blues",
+        title="Top 20 Companies — Orders per Crate Type",
+        labels=dict(x="Crate Type", y="Company", color="Orders")
+    )
+    fig.update_traces(textfont=dict(size=14), texttemplate="%{z}")
+    dark(fig, margin=dict(t=70, b=20, l=180, r=20))
+    fig.update_coloraxes(
+        colorbar=dict(tickfont=dict(color=TEXT), title=dict(font=dict(color=TEXT), text="Orders"))
+    )
+    return fig
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SECTION B — PLASTIC TRAINING NEEDS
+# ─────────────────────────────────────────────────────────────────────────────
+def fig_train(training_df):
+    fig = go.Figure()
+    fig.add_bar(y=training_df["salesowner"], x=training_df["plastic"],
+                name="Plastic Orders", orientation="h", marker_color="#3b82f6")
+    fig.add_bar(y=training_df["salesowner"], x=training_df["non_plastic"],
+                name="Other Types", orientation="h",
+                marker_color="#2a3347")
+    dark(fig, legend_h=True, margin=dict(t=70, b=65, l=170, r=20))
+    fig.update_layout(
+        barmode="stack",
+        title=dict(text="Orders by crate type (last 12 months) — sorted by plastic rate",
+                   font=dict(color=TEXT, size=16))
+    )
+    fig.update_xaxes(title="Orders")
+    return fig
+
+
+def fig_rate(training_df):
+    fig = px.bar(
+        training_df, y="salesowner", x="plastic_rate", orientation="h",
+        color="plastic_rate",
+        color_continuous_scale=["#ef4444", "#f59e0b", "#22c55e"],
+        range_color=[0, 100],
+        title="Plastic Conversion Rate (%)",
+        labels={"plastic_rate": "Rate %", "salesowner": ""}
+    )
+    avg_rate = training_df["plastic_rate"].mean()
+    fig.add_vline(x=avg_rate, line_dash="dash", line_color="#6b7280",
+                  annotation_text=f"avg {avg_rate:.0f}%",
+                  annotation_font_color=TEXT)
+    dark(fig, margin=dict(t=70, b=30, l=165, r=20))
+    fig.update_coloraxes(showscale=False)
+    fig.update_xaxes(range=[0, 105])
+    return fig
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SECTION C — ROLLING 3-MONTH TOP 5
+# ─────────────────────────────────────────────────────────────────────────────
+PALETTE = px.colors.qualitative.Plotly + px.colors.qualitative.Safe
+
+
+def fig_bump(rolling_df, all_top_owners, all_months_str):
+    """Bump chart — rank trajectory over time."""
+    color_map = {o: PALETTE[i % len(PALETTE)] for i, o in enumerate(all_top_owners)}
+    fig = go.Figure()
+
+    for owner in all_top_owners:
+        owner_data = rolling_df[rolling_df["salesowner"] == owner].sort_values("month")
+        rank_by_month   = dict(zip(owner_data["month"], owner_data["rank"]))
+        display_by_month = dict(zip(owner_data["month"], owner_data["rank_display"]))
+        orders_by_month = dict(zip(owner_data["month"], owner_data["plastic_orders"]))
+        y_ranks  = [-rank_by_month[m] if m in rank_by_month else None for m in all_months_str]
+        # Store rank text formatting but only use it if Y is not None
+        hover_texts = [
+            f"<b>{owner}</b> — Rank #{display_by_month[m]} ({orders_by_month[m]} orders)"
+            if m in rank_by_month else ""
+            for m in all_months_str
+        ]
+        # For hovertemplate, only output text if customdata has something
+        fig.add_scatter(
+            x=all_months_str, y=y_ranks,
+            mode="lines+markers",
+            name=owner,
+            line=dict(color=color_map.get(owner, "#60a5fa"), width=3),
+            marker=dict(size=9, color=color_map.get(owner, "#60a5fa"),
+                        line=dict(color="#0d1117", width=1.5)),
+            customdata=hover_texts,
+            hovertemplate="%{customdata}<span style='display:none'>%{y}</span><extra></extra>",
+            connectgaps=False,
+            showlegend=True,
+        )
+
+    # Increased top margin to 120 so there is plenty of room for both title and legend
+    dark(fig, height=430, legend_h=False, margin=dict(t=120, b=20, l=60, r=20))
+    fig.update_layout(
+        title=dict(
+            text="Rolling 3-Month RANKING (Running Sum) — Top 5 Performers by Month",
+            font=dict(color=TEXT, size=16),
+            y=0.95, yref="container", yanchor="top"
+        ),
+        dragmode="pan",
+        hovermode="x",           # Replaced 'x unified' with individual 'x' coordinates
+        hoverlabel=dict(
+            bgcolor="#1f2937",
+            font_size=12,
+        ),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom", y=1.05, # Legend sits right above the plot, safely below the title
+            xanchor="center", x=0.5,
+            title_text="",
+        )
+    )
+    fig.update_xaxes(
+        showspikes=True,
+        spikemode="across",      # Draws a vertical guide line across all ranks for the hovered month
+        spikedash="solid",
+        spikecolor="#4b5563",
+        spikethickness=1,
+    )
+    fig.update_yaxes(
+        tickvals=[-1, -2, -3, -4, -5],
+        ticktext=["🥇 #1", "🥈 #2", "🥉 #3", "  #4", "  #5"],
+        title="Rank in rolling window",
+        range=[-5.4, -0.6],  # STRICTLY limit Y-axis to 5
+        dtick=1, showgrid=True,
+        fixedrange=True,
+    )
+
+    # Show last 15 months by default, with a native rangeslider for horizontal scrolling
+    visible_window = 15
+    x_start = all_months_str[-visible_window] if len(all_months_str) > visible_window else all_months_str[0]
+    x_end = all_months_str[-1]
+
+    fig.update_xaxes(
+        tickangle=-45, title_text="",
+        range=[x_start, x_end],
+        rangeslider=dict(visible=True, thickness=0.06, bgcolor="#1a2030", bordercolor="#374151", borderwidth=1),
+    )
+    return fig
+
+
+def fig_heat_rolling(pivot_full, all_top_owners):
+    """Heatmap — the exact data behind the bump chart."""
+    fig = px.imshow(
+        pivot_full.T,  # Transpose so owners are on Y-axis and months are on X-axis
+        color_continuous_scale="Blues",
+        aspect="auto",
+        labels=dict(x="Month", y="Sales Owner", color="Total Orders"),
+        text_auto=True,
+    )
+    dark(fig, height=max(300, len(all_top_owners) * 35))
+    fig.update_xaxes(tickangle=45, dtick="M6", title_text="Month")
+    fig.update_yaxes(title_text="Sales Owner")
+    fig.update_traces(
+        hovertemplate="Sales Owner: %{y}<br>Month: %{x}<br>Orders (T3M): %{z}<extra></extra>"
+    )
+    fig.update_layout(
+        plot_bgcolor="#0d1117", paper_bgcolor="#0d1117",
+        margin=dict(t=20, b=50, l=150, r=20),
+        title_text="",  # Explicitly set title to empty string instead of None
+        annotations=[]  # Nuke any rogue annotations created by px.imshow that say 'undefined'
+    )
+    fig.update_coloraxes(colorbar=dict(thickness=12, len=0.8, x=1.02, title="Orders"))
+    return fig
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SECTION D — COMMISSIONS LEADERBOARD
+# ─────────────────────────────────────────────────────────────────────────────
+def fig_comm(commissions):
+    fig = px.bar(
+        commissions.sort_values("commission_euros"),
+        x="commission_euros", y="salesowner_name", orientation="h",
+        text="commission_euros",
+        color="commission_euros",
+        color_continuous_scale=["#1d4ed8", "#3b82f6", "#60a5fa", "#93c5fd"],
+        labels={"commission_euros": "Commission (€)", "salesowner_name": ""},
+        title="Total Commissions per Sales Owner (all time)"
+    )
+    fig.update_traces(
+        texttemplate="€%{text:,.2f}", textposition="outside",
+        textfont=dict(color=TEXT, size=11)
+    )
+    dark(fig, margin=dict(t=55, b=20, l=165, r=110))
+    fig.update_coloraxes(showscale=False)
+    return fig
+
+
+def fig_donut(commissions):
+    fig = px.pie(
+        commissions, values="commission_euros", names="salesowner_name",
+        hole=0.6, title="Commission Share",
+        color_discrete_sequence=px.colors.qualitative.Plotly
+    )
+    fig.update_traces(
+        textinfo="none",
+        marker=dict(line=dict(color="#0d1117", width=1.5))
+    )
+    dark(fig, legend_h=False, margin=dict(t=55, b=20, l=10, r=10))
+    fig.update_layout(
+        legend=dict(font=dict(color=TEXT, size=10), orientation="v")
+    )
+    total_comm = commissions["commission_euros"].sum()
+    fig.add_annotation(
+        text=f"€{total_comm:,.0f}", x=0.5, y=0.5, showarrow=False,
+        font=dict(size=18, color="#60a5fa", family="Inter"),
+        xref="paper", yref="paper"
+    )
+    return fig
+
+
+def fig_cpo(comm_merged):
+    fig = px.bar(
+        comm_merged.sort_values("commission_per_order"),
+        x="commission_per_order", y="salesowner_name", orientation="h",
+        text="cpo_text",  # Use pre-formatted text column
+        color="commission_per_order",
+        color_continuous_scale=["#10b981", "#34d399", "#6ee7b7", "#a7f3d0"],
+        labels={"commission_per_order": "Commission per Order (€)", "salesowner_name": ""},
+        title="Commission per Order (All-Time)"
+    )
+    fig.update_traces(
+        textposition="outside",
+        textfont=dict(color=TEXT, size=11),
+        cliponaxis=False
+    )
+    # Give the axis 25% extra right padding dynamically based on data max
+    fig.update_xaxes(range=[0, comm_merged["commission_per_order"].max() * 1.25])
+    # Increased right margin to 90 to prevent '€36.41' from being clipped by the SVG boundary
+    dark(fig, margin=dict(t=55, b=20, l=165, r=90))
+    fig.update_coloraxes(showscale=False)
+    return fig
+
+
+def fig_dev(comm_merged, mean_cpo):
+    # Deviation chart
+    df_sorted = comm_merged.sort_values("cpo_deviation")
+    colors = ["#10b981" if val >= 0 else "#ef4444" for val in df_sorted["cpo_deviation"]]
+
+    fig = px.bar(
+        df_sorted,
+        x="cpo_deviation", y="salesowner_name", orientation="h",
+        text="dev_text", # Use pre-formatted text column
+        labels={"cpo_deviation": "Deviation from Mean (€)", "salesowner_name": ""},
+        title=f"Deviation from Mean (€{mean_cpo:.2f})"
+    )
+    fig.update_traces(
+        marker_color=colors,
+        textposition="outside",
+        textfont=dict(color=TEXT, size=11),
+        cliponaxis=False
+    )
+    # Symmetrically expand the axis by 30% based on the max deviation
+    max_abs_dev = comm_merged["cpo_deviation"].abs().max()
+    fig.update_xaxes(range=[-max_abs_dev * 1.3, max_abs_dev * 1.3])
+    # Increased right margin and left margin to prevent clipping on both extremes
+    dark(fig, margin=dict(t=55, b=20, l=165, r=100))
+    fig.add_vline(x=0, line_width=2, line_color="#4b5563", line_dash="dash")
+    return fig
+
+
+def fig_roles(role_pcts, main_order, category_roles, role_map):
+    # Generate colors
+    base_colors = ["#3b82f6", "#f59e0b", "#22c55e", "#ef4444", "#a855f7", "#ec4899", "#8b5cf6"]
+    role_colors = {role: base_colors[i % len(base_colors)] for i, role in role_map.items()}
+
+    fig = go.Figure()
+
+    for role in category_roles:
+        sub_df = role_pcts[role_pcts["role"] == role].set_index("salesowner").reindex(main_order).fillna(0)
+        # Only show text if percentage is > 0 to avoid clutter
+        text_labels = sub_df["pct"].apply(lambda x: f"{x:.1f}%" if x > 0 else "")
+
+        fig.add_trace(go.Bar(
+            y=main_order,
+            x=sub_df["pct"],        # Exact percentages
+            name=role,
+            orientation="h",
+            marker_color=role_colors.get(role, "#3b82f6"),
+            text=text_labels,
+            textposition="inside",
+            insidetextanchor="middle",
+            textfont=dict(color="white")
+        ))
+
+    fig.update_layout(
+        barmode="stack",
+        xaxis_title="",
+        legend=dict(orientation="h", y=-0.2),
+        bargap=0.3,
+        title_text="",  # Remove undefined title
+        annotations=[]  # Clear any hidden annotations
+    )
+    dark(fig, margin=dict(t=20, b=50, l=140, r=20))
+    fig.update_xaxes(ticksuffix="%", range=[0, 100], showgrid=False)
+    return fig
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SECTION E — COMPANY PORTFOLIO
+# ─────────────────────────────────────────────────────────────────────────────
+def fig_co(top_co):
+    fig = px.bar(
+        top_co.sort_values("n_owners"),
+        x="n_owners", y="company_name", orientation="h",
+        color="n_owners", color_continuous_scale="Blues",
+        title="Top 20 Companies by Number of Assigned Sales Owners",
+        labels={"n_owners": "# Sales Owners", "company_name": ""},
+        text="n_owners"
+    )
+    fig.update_traces(textposition="outside", textfont=dict(color=TEXT))
+    dark(fig, margin=dict(t=55, b=20, l=185, r=60))
+    fig.update_coloraxes(showscale=False)
+    return fig
+
+
+def fig_city(city_counts):
+    fig = px.bar(
+        city_counts.head(15).sort_values("orders"),
+        x="orders", y="city", orientation="h",
+        color="orders", color_continuous_scale="Greens",
+        title="Top 15 Cities by Order Volume",
+        labels={"orders": "Orders", "city": ""},
+        text="orders"
+    )
+    fig.update_traces(textposition="outside", textfont=dict(color=TEXT))
+    dark(fig, margin=dict(t=55, b=20, l=145, r=60))
+    fig.update_coloraxes(showscale=False)
+    return fig
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SECTION F — ORDER TRENDS & SEASONALITY
+# ─────────────────────────────────────────────────────────────────────────────
+def fig_yoy(yoy):
+    fig = px.bar(
+        yoy, x="year_q", y="count", color="crate_type",
+        color_discrete_map=CRATE_COLORS, barmode="group",
+        title="Quarterly Order Volume by Crate Type",
+        labels={"year_q": "", "count": "Orders", "crate_type": "Type"}
+    )
+    dark(fig, legend_h=True, margin=dict(t=70, b=70, l=50, r=20))
+    fig.update_xaxes(tickangle=-45)
+    return fig
+
+
+def fig_season(seasonality):
+    month_order = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
+    fig = px.line_polar(
+        seasonality, r="count", theta="month_name",
+        color="crate_type", color_discrete_map=CRATE_COLORS,
+        line_close=True, title="Seasonality Radar by Crate Type",
+        category_orders={"month_name": month_order}
+    )
+    fig.update_traces(fill="toself", opacity=0.45)
+    dark(fig, height=400, legend_h=True, margin=dict(t=70, b=55, l=20, r=20))
+    fig.update_layout(
+        polar=dict(
+            bgcolor=BG,
+            angularaxis=dict(gridcolor=GRID, linecolor=GRID, tickfont=dict(color=TEXT, size=11)),
+            radialaxis=dict(gridcolor=GRID, linecolor=GRID, tickfont=dict(color=TEXT, size=9))
+        )
+    )
+    return fig
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ALL FIGURES
+# ─────────────────────────────────────────────────────────────────────────────
+def build_figures(sections, commissions):
+    """Every dashboard figure for one set of ``analytics.compute_sections`` results."""
+    a, b, c = sections["a"], sections["b"], sections["c"]
+    d_cpo, d_roles = sections["d_cpo"], sections["d_roles"]
+    e, f = sections["e"], sections["f"]
+    return {
+        "fig_pie":            fig_pie(a["overall"]),
+        "fig_bar":            fig_bar(a["monthly_cnt"]),
+        "fig_heat_companies": fig_heat_companies(a["pivot"]),
+        "fig_train":          fig_train(b),
+        "fig_rate":           fig_rate(b),
+        "fig_bump":           fig_bump(c["rolling_df"], c["all_top_owners"], c["all_months_str"]),
+        "fig_heat_rolling":   fig_heat_rolling(c["pivot_full"], c["all_top_owners"]),
+        "fig_comm":           fig_comm(commissions),
+        "fig_donut":          fig_donut(commissions),
+        "fig_cpo":            fig_cpo(d_cpo["comm_merged"]),
+        "fig_dev":            fig_dev(d_cpo["comm_merged"], d_cpo["mean_cpo"]),
+        "fig_roles":          fig_roles(d_roles["role_pcts"], d_roles["main_order"],
+                                        d_roles["category_roles"], d_roles["role_map"]),
+        "fig_co":             fig_co(e["top_co"]),
+        "fig_city":           fig_city(e["city_counts"]),
+        "fig_yoy":            fig_yoy(f["yoy"]),
+        "fig_season":         fig_season(f["seasonality"]),
+    }
@@ -0,0 +1,234 @@
+"""
+IFCO Data Engineering Challenge — Dashboard Load Test
+=====================================================
+Simulates concurrent analysts on ``dashboard.py``. Every session drives the
+real script headlessly through Streamlit's testing API (``AppTest``) and
+replays a scripted sequence of filter changes; sessions run as threads of
+worker processes, which share Streamlit's caches exactly like the sessions
+of one server process do.
+
+Reported per run: p50 / p95 / p99 rerun latency (overall and per step) and
+the CPU time, CPU utilisation and RSS of every worker process. Latency and
+memory budgets turn the run into a release gate (exit code 1 on breach).
+
+Usage:
+    python dashboard/loadtest.py [--sessions N] [--processes P] [--iterations K]
+                                 [--think SECONDS] [--budget-p95 MS] [--budget-p99 MS]
+                                 [--max-rss MB] [--json PATH]
+
+Against the local container image (offline, same dependencies and data):
+    docker-compose run --rm dashboard python dashboard/loadtest.py --sessions 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import snapshot
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(HERE, "dashboard.py")
+DATA_DIR = os.path.join(HERE, "data")
+PERCENTILES = (0.50, 0.95, 0.99)
+
+
+def build_scenario(data_dir=DATA_DIR):
+    """
+    Scripted filter changes replayed by every session, as (step, crates,
+    (start, end)) tuples, starting from the default view the app opens
+    with. Values are derived from the snapshot so the script fits any export.
+    """
+    stats = snapshot.table_stats(data_dir, "silver_orders")
+    crates = list(stats["crate_types"])
+    start, end = stats["min_date"].date(), stats["max_date"].date()
+    quarter = max(start, (pd.Timestamp(end) - pd.DateOffset(months=3)).date())
+    year = max(start, (pd.Timestamp(end) - pd.DateOffset(years=1)).date())
+    plastic = [c for c in crates if c == "Plastic"] or crates[:1]
+    return [
+        ("single crate type", plastic, (start, end)),
+        ("last quarter", plastic, (quarter, end)),
+        ("all crates, last quarter", crates, (quarter, end)),
+        ("last 12 months", crates, (year, end)),
+        ("reset filters", crates, (start, end)),
+    ]
+
+
+def _run_session(session_id, scenario, iterations, think, seed):
+    # One simulated analyst: opens the app, then replays the scenario
+    rng = random.Random(seed + session_id)
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    samples = []
+
+    def timed(step, rerun):
+        t0 = time.perf_counter()
+        try:
+            rerun()
+            error = "; ".join(str(e.value) for e in at.exception) or None
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        samples.append({
+            "session": session_id,
+            "step": step,
+            "latency_ms": (time.perf_counter() - t0) * 1000,
+            "error": error,
+        })
+
+    def change_filters(crates, date_range):
+        # Widget lookups fail too when the previous run did not render them
+        at.multiselect[0].set_value(crates)
+        at.date_input[0].set_value(date_range)
+        at.run()
+
+    timed("open app", at.run)
+    for _ in range(iterations):
+        for step, crates, date_range in scenario:
+            if think:
+                time.sleep(rng.uniform(0, think))
+            timed(step, lambda: change_filters(crates, date_range))
+    return samples
+
+
+def _process_stats(wall_s):
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_s = usage.ru_utime + usage.ru_stime
+    with open("/proc/self/statm") as fh:
+        rss_pages = int(fh.read().split()[1])
+    return {
+        "pid": os.getpid(),
+        "cpu_s": round(cpu_s, 2),
+        # Above 100% means more than one core was busy (pandas / Arrow threads)
+        "cpu_pct": round(100 * cpu_s / wall_s, 1) if wall_s else 0.0,
+        "rss_mb": round(rss_pages * resource.getpagesize() / 2**20, 1),
+        "max_rss_mb": round(usage.ru_maxrss / 1024, 1),  # kilobytes on Linux
+    }
+
+
+def _run_worker(session_ids, scenario, iterations, think, seed):
+    # Runs in a worker process: its sessions are threads, like a Streamlit server.
+    # Deprecation notices would otherwise be logged once per rerun and session.
+    logging.disable(logging.WARNING)
+    # One serial run first: the first script runs of a process set up Streamlit's
+    # runtime and caches and are not safe to race. Untimed; if it fails, the
+    # sessions hit and report the same failure.
+    try:
+        AppTest.from_file(APP_PATH, default_timeout=600).run()
+    except Exception:
+        pass
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(session_ids)) as pool:
+        futures = [pool.submit(_run_session, s, scenario, iterations, think, seed)
+                   for s in session_ids]
+        samples = [row for f in futures for row in f.result()]
+    stats = _process_stats(time.perf_counter() - t0)
+    stats["sessions"] = len(session_ids)
+    return samples, stats
+
+
+def summarize(samples):
+    """Rerun count, error count and latency percentiles (ms), overall and per step."""
+    df = pd.DataFrame(samples)
+
+    def describe(group):
+        lat = group["latency_ms"]
+        row = {"reruns": len(group), "errors": int(group["error"].notna().sum())}
+        for q in PERCENTILES:
+            row[f"p{int(q * 100)}_ms"] = round(lat.quantile(q), 1)
+        row["max_ms"] = round(lat.max(), 1)
+        return row
+
+    per_step = {step: describe(g) for step, g in df.groupby("step", sort=False)}
+    return describe(df), per_step
+
+
+def check_budgets(overall, processes, budget_p95=None, budget_p99=None, max_rss=None):
+    """Return the list of violated budgets (empty when the run passes)."""
+    failures = []
+    if overall["errors"]:
+        failures.append(f"{overall['errors']} reruns raised an exception")
+    if budget_p95 is not None and overall["p95_ms"] > budget_p95:
+        failures.append(f"p95 {overall['p95_ms']:.0f} ms > budget {budget_p95:.0f} ms")
+    if budget_p99 is not None and overall["p99_ms"] > budget_p99:
+        failures.append(f"p99 {overall['p99_ms']:.0f} ms > budget {budget_p99:.0f} ms")
+    if max_rss is not None:
+        for p in processes:
+            if p["max_rss_mb"] > max_rss:
+                failures.append(f"process {p['pid']} peak RSS {p['max_rss_mb']:.0f} MB > budget {max_rss:.0f} MB")
+    return failures
+
+
+def run_load_test(sessions=10, processes=1, iterations=1, think=0.0, seed=0):
+    """Run ``sessions`` concurrent sessions spread over ``processes`` workers."""
+    scenario = build_scenario()
+    shares = [list(range(sessions))[i::processes] for i in range(processes)]
+    shares = [s for s in shares if s]
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=len(shares)) as pool:
+        results = list(pool.map(_run_worker, shares, [scenario] * len(shares),
+                                [iterations] * len(shares), [think] * len(shares),
+                                [seed] * len(shares)))
+    wall_s = time.perf_counter() - t0
+
+    samples = [row for rows, _ in results for row in rows]
+    overall, per_step = summarize(samples)
+    return {
+        "snapshot": snapshot.version_id(DATA_DIR),
+        "sessions": sessions,
+        "processes": len(shares),
+        "iterations": iterations,
+        "think_s": think,
+        "wall_s": round(wall_s, 1),
+        "overall": overall,
+        "steps": per_step,
+        "process_stats": [stats for _, stats in results],
+        "errors": sorted({r["error"] for r in samples if r["error"]}),
+    }
+
+
+def print_report(result, failures):
+    print(f"Snapshot {result['snapshot']} · {result['sessions']} sessions · "
+          f"{result['processes']} process(es) · {result['iterations']} iteration(s) · "
+          f"{result['wall_s']}s wall time")
+    steps = pd.DataFrame.from_dict({**result["steps"], "ALL": result["overall"]}, orient="index")
+    print("\nRerun latency")
+    print(steps.to_string())
+    print("\nWorker processes")
+    print(pd.DataFrame(result["process_stats"]).to_string(index=False))
+    for error in result["errors"]:
+        print(f"\nError: {error}")
+    print("\n" + ("FAIL: " + "; ".join(failures) if failures else "PASS: all budgets met"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with concurrent simulated sessions.")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent simulated analysts (default: 10)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Worker processes the sessions are spread over (default: 1, like one server)")
+    parser.add_argument("--iterations", type=int, default=1, help="Scenario repetitions per session (default: 1)")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="Max random pause between filter changes, in seconds (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the think-time pauses")
+    parser.add_argument("--budget-p95", type=float, default=None, help="Fail if p95 rerun latency exceeds MS")
+    parser.add_argument("--budget-p99", type=float, default=None, help="Fail if p99 rerun latency exceeds MS")
+    parser.add_argument("--max-rss", type=float, default=None, help="Fail if a worker's peak RSS exceeds MB")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    result = run_load_test(args.sessions, args.processes, args.iterations, args.think, args.seed)
+    failures = check_budgets(result["overall"], result["process_stats"],
+                             args.budget_p95, args.budget_p99, args.max_rss)
+    result["failures"] = failures
+    print_report(result, failures)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,201 @@
+"""
+IFCO Data Engineering Challenge — Build-Time Precomputation
+===========================================================
+Derives everything the dashboard would otherwise compute on its first
+request, so fresh containers serve it straight away. Run during
+``docker build`` (and again on start-up, where it is a no-op unless the
+mounted data or the dashboard code changed):
+
+* **Legacy CSV snapshots** are converted to the published Parquet layout
+  (``snapshots/<snapshot id>-<code>/``) with the relations the notebook export
+  adds: month partitions, ``silver_orders_exploded``,
+  ``gold_salesowner_roles``, ``gold_salesowner_position_net_value`` and
+  ``gold_owner_month_sketches``. The dashboard serves the conversion
+  instead of parsing the CSVs.
+* **The default view** is pre-rendered by ``report.py``.
+
+Usage:
+    python dashboard/precompute.py [--data-dir DIR] [--out DIR]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import analytics
+import report
+import sketches
+import snapshot
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, "data")
+PRECOMPUTED_DIR = snapshot.PRECOMPUTED_DIR
+PARTITION_COLUMN = "order_month"
+
+# Gold/Silver tables copied as they are
+STATIC_TABLES = ["gold_crate_distribution", "gold_sales_commissions",
+                 "gold_companies_salesowners", "silver_invoicing"]
+
+# Spark type names for the manifest schema, as written by the notebook export
+_SPARK_TYPES = {"object": "string", "int64": "long", "int16": "short", "int8": "byte",
+                "float64": "double", "bool": "boolean", "datetime64[ns]": "date"}
+
+
+def _spark_type(values):
+    # Object columns hold strings, or bytes for the sketch registers
+    if values.dtype == object and len(values) and isinstance(values.iloc[0], bytes):
+        return "binary"
+    return _SPARK_TYPES.get(str(values.dtype), "string")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(8 * 1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _to_parquet(df, path):
+    # Dates are stored as Parquet DATE, like Spark's DateType in the export
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if "order_date" in table.column_names:
+        i = table.column_names.index("order_date")
+        table = table.set_column(i, "order_date", table["order_date"].cast(pa.date32()))
+    pq.write_table(table, path)
+
+
+def _write_table(version_dir, name, df, partitioned=False):
+    # Writes one table and returns its manifest entry (same keys as the export)
+    target = os.path.join(version_dir, name)
+    os.makedirs(target)
+    columns = [c for c in df.columns if c != PARTITION_COLUMN]
+    files, partitions = [], []
+    if partitioned:
+        for month, part in df.groupby(PARTITION_COLUMN, dropna=False, sort=True):
+            # Rows without a parseable date land in Spark's default partition
+            path = f"{PARTITION_COLUMN}={month if isinstance(month, str) else '__HIVE_DEFAULT_PARTITION__'}"
+            os.makedirs(os.path.join(target, path))
+            _to_parquet(part[columns], os.path.join(target, path, "part-00000.parquet"))
+            files.append(f"{path}/part-00000.parquet")
+            dated = part["order_date"].dropna()
+            partitions.append({
+                "path": path,
+                "min_date": dated.min().date().isoformat() if len(dated) else None,
+                "max_date": dated.max().date().isoformat() if len(dated) else None,
+                "rows": len(part),
+                "crate_types": sorted(part["crate_type"].dropna().unique()),
+            })
+    else:
+        columns = list(df.columns)
+        _to_parquet(df, os.path.join(target, "part-00000.parquet"))
+        files.append("part-00000.parquet")
+
+    entry = {
+        "path": name,
+        "rows": len(df),
+        "schema": {"type": "struct", "fields": [
+            {"name": c, "type": _spark_type(df[c]), "nullable": True}
+            for c in columns
+        ]},
+        "files": [
+            {"name": f, "bytes": os.path.getsize(os.path.join(target, f)),
+             "sha256": _sha256(os.path.join(target, f))}
+            for f in files
+        ],
+    }
+    if partitioned:
+        entry["partition_by"] = PARTITION_COLUMN
+        entry["partitions"] = partitions
+    return entry
+
+
+def convert_legacy(data_dir, out_dir):
+    """
+    Convert the legacy CSV snapshot in ``data_dir`` to a published Parquet
+    snapshot under ``out_dir`` (skipped when it exists); returns its data
+    directory. The snapshot keeps the CSV fingerprint as version, so reports
+    rendered for either are interchangeable.
+    """
+    target = snapshot.converted_dir(data_dir, out_dir)
+    if os.path.exists(os.path.join(target, "CURRENT")):
+        return target
+    version = snapshot.version_id(data_dir)
+
+    orders = pd.read_csv(os.path.join(data_dir, "silver_orders.csv"))
+    orders["order_date"] = pd.to_datetime(orders["date"], format=snapshot.DATE_FORMAT, errors="coerce")
+    orders[PARTITION_COLUMN] = orders["order_date"].dt.strftime("%Y-%m")
+
+    # Same relation as the export's posexplode, without a Python loop per order
+    exploded = (orders[["order_id", "date", "crate_type", "order_date", PARTITION_COLUMN]]
+                .assign(salesowner=orders["salesowners"].astype(str).str.split(","))
+                .explode("salesowner"))
+    exploded["owner_rank"] = exploded.groupby(level=0).cumcount()
+    exploded["salesowner"] = exploded["salesowner"].str.strip()
+    exploded = exploded.reset_index(drop=True)
+
+    roles = exploded.groupby(["salesowner", "owner_rank"]).size().reset_index(name="orders")
+    sketch_table = sketches.to_table(sketches.build(exploded.assign(date=exploded["order_date"])))
+    net_value = analytics.net_value_by_position(orders.assign(date=orders["order_date"]),
+                                                pd.read_csv(os.path.join(data_dir, "silver_invoicing.csv")))
+
+    # Staged next to the target and moved in one step, like a published export
+    staging = f"{target}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    version_dir = os.path.join(staging, version)
+    os.makedirs(version_dir)
+    tables = {name: _write_table(version_dir, name, pd.read_csv(os.path.join(data_dir, f"{name}.csv")))
+              for name in STATIC_TABLES}
+    tables["silver_orders"] = _write_table(version_dir, "silver_orders", orders, partitioned=True)
+    tables["silver_orders_exploded"] = _write_table(version_dir, "silver_orders_exploded",
+                                                    exploded, partitioned=True)
+    tables["gold_salesowner_roles"] = _write_table(version_dir, "gold_salesowner_roles", roles)
+    tables[analytics.NET_VALUE_TABLE] = _write_table(version_dir, analytics.NET_VALUE_TABLE, net_value)
+    tables[sketches.TABLE] = _write_table(version_dir, sketches.TABLE, sketch_table)
+    tables[sketches.TABLE]["hll_precision"] = sketches.DEFAULT_PRECISION
+
+    manifest = {
+        "format": snapshot.MANIFEST_FORMAT,
+        "version": version,
+        "created_at": pd.Timestamp.now(tz="UTC").isoformat(),
+        "compression": "snappy",
+        "source": "legacy-csv",
+        "tables": {name: tables[name] for name in sorted(tables)},
+    }
+    with open(os.path.join(version_dir, "manifest.json"), "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    with open(os.path.join(staging, "CURRENT"), "w") as fh:
+        fh.write(version)
+    os.replace(staging, target)
+    return target
+
+
+def precompute(data_dir=DATA_DIR, out_dir=PRECOMPUTED_DIR):
+    """Derive the served snapshot and its default-view report; returns the served data dir."""
+    t0 = time.perf_counter()
+    served_dir = data_dir
+    if snapshot.current_version_dir(data_dir) is None:
+        served_dir = convert_legacy(data_dir, out_dir)
+        print(f"Legacy CSV snapshot converted to Parquet: {served_dir}")
+    t1 = time.perf_counter()
+    report.render_report(served_dir)
+    t2 = time.perf_counter()
+    print(f"Precomputed snapshot {snapshot.version_id(served_dir)}: "
+          f"convert {t1 - t0:.1f}s · report {t2 - t1:.1f}s")
+    return served_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the dashboard's derived artifacts.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Snapshot directory (default: dashboard/data)")
+    parser.add_argument("--out", default=PRECOMPUTED_DIR,
+                        help="Precomputed artifacts root (default: $IFCO_PRECOMPUTED_DIR or dashboard/precomputed)")
+    args = parser.parse_args()
+    precompute(args.data_dir, args.out)
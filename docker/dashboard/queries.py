@@ -0,0 +1,317 @@
+"""
+IFCO Data Engineering Challenge — Embedded SQL Engine
+=====================================================
+Section computations of the dashboard as parameterized DuckDB queries run
+in-process straight over the snapshot files.
+
+Every table of the snapshot is exposed as a view over its Parquet folder
+(or legacy CSV). Order-level queries filter on ``order_month``, so DuckDB
+prunes the month partitions at scan time; aggregation runs on all cores and
+spills to disk when the working set outgrows ``IFCO_DUCKDB_MEMORY_LIMIT``.
+Only the small aggregated results reach pandas, where they are shaped for
+the charts by the same helpers as the pandas pipelines in ``analytics``.
+
+DuckDB is optional: without it (or with ``IFCO_QUERY_ENGINE=pandas``) the
+dashboard keeps using ``analytics`` on loaded DataFrames.
+"""
+
+import functools
+import os
+import re
+import tempfile
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # optional dependency, see module docstring
+    duckdb = None
+
+import analytics
+import snapshot
+
+ENGINE = os.environ.get("IFCO_QUERY_ENGINE", "duckdb" if duckdb is not None else "pandas")
+MEMORY_LIMIT = os.environ.get("IFCO_DUCKDB_MEMORY_LIMIT")   # e.g. "2GB"; DuckDB default otherwise
+TEMP_DIR = os.environ.get("IFCO_DUCKDB_TEMP_DIR", os.path.join(tempfile.gettempdir(), "ifco_duckdb"))
+
+# Legacy CSVs only have the Silver layer's dd.MM.yy strings; published
+# snapshots carry the typed order_date
+_ORDER_DATE = f"try_strptime(date, '{snapshot.DATE_FORMAT}')::DATE AS order_date"
+
+
+def _literal(path):
+    # CREATE VIEW takes no bound parameters: paths are inlined as escaped SQL strings
+    return "'" + path.replace("'", "''") + "'"
+
+
+def _source(data_dir, name):
+    # Table function reading one exported table
+    version_dir = snapshot.current_version_dir(data_dir)
+    if version_dir is None:
+        path = os.path.join(data_dir, f"{name}.csv")
+        return f"read_csv({_literal(path)}, header = true)"
+    path = os.path.join(version_dir, snapshot.read_manifest(data_dir)["tables"][name]["path"])
+    return f"read_parquet({_literal(path + '/**/*.parquet')}, hive_partitioning = true)"
+
+
+def _create_views(con, data_dir):
+    for view, name in [("crate_dist", "gold_crate_distribution"),
+                       ("commissions", "gold_sales_commissions"),
+                       ("companies", "gold_companies_salesowners")]:
+        con.execute(f"CREATE VIEW {view} AS SELECT * FROM {_source(data_dir, name)}")
+
+    if snapshot.current_version_dir(data_dir) is None:
+        # Legacy CSVs: no month partitions and no exploded relation to read
+        path = os.path.join(data_dir, "silver_orders.csv")
+        con.execute(f"""
+            CREATE VIEW orders AS
+            SELECT *, strftime(order_date, '%Y-%m') AS order_month
+            FROM (SELECT *, {_ORDER_DATE} FROM read_csv({_literal(path)}, header = true, all_varchar = true))
+        """)
+        con.execute("""
+            CREATE VIEW orders_exp AS
+            SELECT order_id, date, crate_type, order_date, order_month,
+                   trim(salesowner_raw) AS salesowner, owner_rank
+            FROM (SELECT *,
+                         unnest(string_split(salesowners, ',')) AS salesowner_raw,
+                         generate_subscripts(string_split(salesowners, ','), 1) - 1 AS owner_rank
+                  FROM orders)
+        """)
+    else:
+        con.execute(f"CREATE VIEW orders AS SELECT * FROM {_source(data_dir, 'silver_orders')}")
+        con.execute(f"CREATE VIEW orders_exp AS SELECT * FROM {_source(data_dir, 'silver_orders_exploded')}")
+
+    if snapshot.has_table(data_dir, "gold_salesowner_roles"):
+        con.execute(f"CREATE VIEW owner_roles AS SELECT * FROM "
+                    f"{_source(data_dir, 'gold_salesowner_roles')}")
+    else:
+        con.execute("""
+            CREATE VIEW owner_roles AS
+            SELECT salesowner, owner_rank, count(*) AS orders
+            FROM orders_exp GROUP BY salesowner, owner_rank
+        """)
+
+
+@functools.lru_cache(maxsize=2)
+def _connect(data_dir, version):
+    # One in-memory database per snapshot version; views only, no data is copied
+    config = {"temp_directory": TEMP_DIR}
+    if MEMORY_LIMIT:
+        config["memory_limit"] = MEMORY_LIMIT
+    con = duckdb.connect(config=config)
+    _create_views(con, data_dir)
+    return con
+
+
+def query(data_dir, sql, params=None):
+    """Run ``sql`` with named ``$params`` against the current snapshot of ``data_dir``."""
+    con = _connect(data_dir, snapshot.version_id(data_dir))
+    # DuckDB rejects unused parameters: pass only those the statement names
+    used = set(re.findall(r"\$(\w+)", sql))
+    params = {k: v for k, v in (params or {}).items() if k in used}
+    # A cursor per call: Streamlit sessions query from concurrent threads
+    with con.cursor() as cur:
+        return cur.execute(sql, params).df()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SECTION QUERIES
+# ─────────────────────────────────────────────────────────────────────────────
+# Rows of the selected crate types and date range; the order_month bounds
+# only prune partitions, order_date is the exact filter.
+_FILTERED = """
+    order_month BETWEEN $m_start AND $m_end
+    AND order_date BETWEEN $d_start AND $d_end
+"""
+_SELECTED = _FILTERED + " AND list_contains($crates, crate_type)"
+
+
+def filter_params(sel_crates, d_start, d_end, **extra):
+    """Query parameters of the sidebar filters, as the section queries name them."""
+    params = {
+        "crates":  list(sel_crates),
+        "d_start": d_start.date(),
+        "d_end":   d_end.date(),
+        "m_start": d_start.strftime("%Y-%m"),
+        "m_end":   d_end.strftime("%Y-%m"),
+    }
+    params.update(extra)
+    return params
+
+
+def filtered_orders(data_dir, sel_crates, d_start, d_end):
+    """Orders of the selected crate types and date range, newest first (Data Explorer)."""
+    return query(data_dir, f"""
+        SELECT order_id, order_date AS date, company_name, crate_type,
+               contact_full_name, contact_address, salesowners
+        FROM orders WHERE {_SELECTED}
+        ORDER BY order_date DESC
+    """, filter_params(sel_crates, d_start, d_end))
+
+
+def kpis(data_dir, params):
+    """
+    Headline KPIs of the selected view. Commissions and active salesowners are
+    all-time (the latter from the roles table, with the range count alongside).
+    """
+    row = query(data_dir, f"""
+        SELECT count(*) FILTER (WHERE list_contains($crates, crate_type))   AS total_orders,
+               count(*) FILTER (WHERE crate_type = 'Plastic')               AS total_plastic,
+               count(DISTINCT company_name) FILTER (WHERE list_contains($crates, crate_type))
+                                                                            AS active_companies,
+               (SELECT count(DISTINCT salesowner) FROM owner_roles)         AS active_owners,
+               (SELECT count(DISTINCT salesowner) FROM orders_exp WHERE {_SELECTED}) AS range_owners,
+               (SELECT sum(commission_euros) FROM commissions)             AS total_commission
+        FROM orders WHERE {_FILTERED}
+    """, params).iloc[0]
+    total_orders = int(row["total_orders"])
+    return {
+        "total_orders":     total_orders,
+        "plastic_pct":      row["total_plastic"] / total_orders * 100 if total_orders else 0,
+        "total_commission": row["total_commission"],
+        "active_owners":    int(row["active_owners"]),
+        "range_owners":     int(row["range_owners"]),
+        "active_companies": int(row["active_companies"]),
+    }
+
+
+def crate_distribution(data_dir, params):
+    """Section A — overall split, monthly counts and the top-20 company heatmap."""
+    overall = query(data_dir, f"""
+        SELECT crate_type, count(*) AS count
+        FROM orders WHERE {_SELECTED}
+        GROUP BY crate_type ORDER BY count DESC, crate_type
+    """, params)
+    monthly_cnt = query(data_dir, f"""
+        SELECT strftime(order_date, '%Y-%m') AS month, crate_type, count(*) AS count
+        FROM orders WHERE {_SELECTED}
+        GROUP BY ALL ORDER BY month, crate_type
+    """, params)
+    top_companies = query(data_dir, """
+        WITH per_type AS (
+            SELECT company_name, crate_type, avg(total_crates) AS total_crates
+            FROM crate_dist GROUP BY ALL
+        ), top AS (
+            SELECT company_name FROM per_type
+            GROUP BY company_name ORDER BY sum(total_crates) DESC, company_name LIMIT 20
+        )
+        SELECT per_type.* FROM per_type SEMI JOIN top USING (company_name)
+    """)
+    return {"overall": overall, "monthly_cnt": monthly_cnt,
+            "pivot": analytics.top_company_pivot(top_companies)}
+
+
+def training_needs(data_dir, params):
+    """Section B — distinct total / plastic orders per owner, 12 months up to the end date."""
+    cutoff = pd.Timestamp(params["d_end"]) - pd.DateOffset(months=12)
+    counts = query(data_dir, """
+        SELECT salesowner,
+               count(DISTINCT order_id) AS total,
+               count(DISTINCT order_id) FILTER (WHERE crate_type = 'Plastic') AS plastic
+        FROM orders_exp
+        WHERE order_month BETWEEN $cutoff_month AND $m_end
+          AND order_date BETWEEN $cutoff AND $d_end
+        GROUP BY salesowner
+    """, {**params, "cutoff": cutoff.date(), "cutoff_month": cutoff.strftime("%Y-%m")})
+    counts = counts.set_index("salesowner")
+    return analytics.training_table(counts["total"], counts["plastic"])
+
+
+def rolling_top5(data_dir, params, all_months):
+    """Section C — distinct plastic orders per owner in every rolling 3-month window."""
+    counts = query(data_dir, """
+        WITH months AS (
+            SELECT unnest($months)::DATE AS month
+        ), plastic AS (
+            SELECT order_id, salesowner, date_trunc('month', order_date) AS month
+            FROM orders_exp
+            WHERE crate_type = 'Plastic' AND order_month BETWEEN $lookback_month AND $m_end
+        )
+        SELECT strftime(months.month, '%Y-%m') AS month, salesowner,
+               count(DISTINCT order_id) AS plastic_orders
+        FROM months JOIN plastic
+          ON plastic.month BETWEEN months.month - INTERVAL 2 MONTH AND months.month
+        GROUP BY ALL
+    """, {**params,
+          "months": [m.start_time.strftime("%Y-%m-%d") for m in all_months],
+          "lookback_month": str(all_months[0] - 2)})
+    by_month = {m: g.set_index("salesowner")["plastic_orders"] for m, g in counts.groupby("month")}
+    empty = pd.Series(dtype="int64")
+    return analytics.rank_rolling(lambda month: by_month.get(str(month), empty), all_months)
+
+
+def commission_per_order(data_dir):
+    """Section D — commission per order and its deviation from the mean."""
+    comm_merged = query(data_dir, """
+        WITH per_owner AS (
+            SELECT salesowner, sum(orders) AS total_orders FROM owner_roles GROUP BY salesowner
+        ), merged AS (
+            SELECT commissions.*, per_owner.salesowner, per_owner.total_orders,
+                   commission_euros / total_orders AS commission_per_order
+            FROM (SELECT *, row_number() OVER () AS row_nr FROM commissions) commissions
+            LEFT JOIN per_owner ON commissions.salesowner_name = per_owner.salesowner
+        )
+        SELECT * EXCLUDE (row_nr),
+               commission_per_order - avg(commission_per_order) OVER () AS cpo_deviation
+        FROM merged ORDER BY row_nr
+    """)
+    mean_cpo = comm_merged["commission_per_order"].mean()
+    return analytics.cpo_labels(comm_merged, mean_cpo)
+
+
+def company_portfolio(data_dir, params):
+    """Section E — companies by number of salesowners and top cities."""
+    top_co = query(data_dir, """
+        SELECT *, coalesce(len(string_split(list_salesowners, ',')), 0) AS n_owners
+        FROM companies ORDER BY n_owners DESC, company_name LIMIT 20
+    """)
+    city_counts = query(data_dir, f"""
+        SELECT trim(split_part(contact_address, ',', 1)) AS city, count(*) AS orders
+        FROM orders
+        WHERE {_SELECTED}
+          AND contact_address IS NOT NULL AND NOT starts_with(contact_address, 'Unknown')
+        GROUP BY city ORDER BY orders DESC, city
+    """, params)
+    return {"top_co": top_co, "city_counts": city_counts}
+
+
+def order_trends(data_dir, params):
+    """Section F — quarterly volume and calendar-month seasonality by crate type."""
+    yoy = query(data_dir, f"""
+        SELECT year(order_date) || ' Q' || quarter(order_date) AS year_q, crate_type, count(*) AS count
+        FROM orders WHERE {_SELECTED}
+        GROUP BY ALL ORDER BY year_q, crate_type
+    """, params)
+    seasonality = query(data_dir, f"""
+        SELECT month(order_date) AS calendar_month, strftime(order_date, '%b') AS month_name,
+               crate_type, count(*) AS count
+        FROM orders WHERE {_SELECTED}
+        GROUP BY ALL ORDER BY calendar_month, crate_type
+    """, params)
+    return {"yoy": yoy, "seasonality": seasonality}
+
+
+def compute_sections(data_dir, sel_crates, d_start, d_end, owner_roles, sketch=None):
+    """
+    Same result as ``analytics.compute_sections`` for the selected filters,
+    computed by SQL over the snapshot files instead of loaded DataFrames.
+    """
+    params = filter_params(sel_crates, d_start, d_end)
+    all_months = pd.period_range(start=d_start.to_period("M"), end=d_end.to_period("M"), freq="M")
+    if sketch is None:
+        b = training_needs(data_dir, params)
+        c = rolling_top5(data_dir, params, all_months)
+    else:
+        b = analytics.training_needs_approx(sketch, d_end)
+        c = analytics.rolling_top5_approx(sketch, all_months)
+    return {
+        "kpis":  kpis(data_dir, params),
+        "a":     crate_distribution(data_dir, params),
+        "b":     b,
+        "c":     c,
+        "d_cpo": commission_per_order(data_dir),
+        # All-time roles of a few dozen rows: shaped in pandas
+        "d_roles": analytics.role_distribution(owner_roles),
+        "e":     company_portfolio(data_dir, params),
+        "f":     order_trends(data_dir, params),
+    }
@@ -0,0 +1,211 @@
+"""
+IFCO Data Engineering Challenge — Static Report Renderer
+========================================================
+Headless batch mode of the Executive Sales Dashboard. Computes every section
+with the dashboard's default filters (all crate types, full date range)
+through the same ``analytics`` / ``charts`` code, then renders the figures
+into a report bundle per snapshot and code version (see
+``snapshot.code_version``). Only the optional PNG export, which runs kaleido
+per figure, is spread over worker processes:
+
+    reports/<snapshot id>-<code>/report.json   figures + cards served by the live app
+    reports/<snapshot id>-<code>/index.html    standalone HTML report
+    reports/<snapshot id>-<code>/png/*.png     optional PNGs (--png, needs kaleido)
+
+Usage:
+    python dashboard/report.py [--data-dir DIR] [--out DIR] [--png [--workers N]] [--force]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import analytics
+import queries
+import snapshot
+import theme
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, "data")
+REPORT_DIR = os.environ.get("IFCO_REPORT_DIR", os.path.join(HERE, "reports"))
+
+# Static rendition of the dashboard page: section headers, figure rows
+# (with their column ratios) and card rows, in display order.
+LAYOUT = [
+    ("cards", "kpis"),
+    ("section", "📊 A · Distribution of Orders by Crate Type",
+     "Challenge Q1 — How are orders distributed across crate types?"),
+    ("row", ["fig_pie", "fig_bar"], "1fr 1fr"),
+    ("sub", "Company × Crate Type Heatmap"),
+    ("row", ["fig_heat_companies"], "1fr"),
+    ("section", "🎯 B · Who Needs Plastic Crate Training? (Last 12 Months)",
+     "Challenge Q2 — Sales owners with lowest plastic crate conversion rate in the 12 months up to the selected end date"),
+    ("row", ["fig_train", "fig_rate"], "3fr 2fr"),
+    ("sub", "Highest Training Priority (lowest plastic %):"),
+    ("cards", "training"),
+    ("section", "🏆 C · Monthly Top 5 Performers — Plastic (Rolling 3-Month Window)",
+     "Challenge Q3 — Top 5 plastic crate sellers per month on a rolling 3-month evaluation window"),
+    ("row", ["fig_bump"], "1fr"),
+    ("sub", "Heat Map (Running Sum of Orders in Trailing 3-Month Window)"),
+    ("row", ["fig_heat_rolling"], "1fr"),
+    ("sub", "Current Top 5 — Most Recent Rolling Window"),
+    ("cards", "medals"),
+    ("section", "💰 D · Sales Commissions Leaderboard",
+     "Bonus — Full commission breakdown from Test 4"),
+    ("row", ["fig_comm", "fig_donut"], "2fr 1fr"),
+    ("row", ["fig_cpo", "fig_dev"], "1fr 1fr"),
+    ("sub", "Role Distribution per Sales Owner"),
+    ("row", ["fig_roles"], "1fr"),
+    ("section", "🏢 E · Company Portfolio Analysis",
+     "Bonus — Company reach and geographic distribution"),
+    ("row", ["fig_co", "fig_city"], "1fr 1fr"),
+    ("section", "📈 F · Order Trends & Seasonality",
+     "Bonus — Year-over-year comparison and monthly seasonality by crate type"),
+    ("row", ["fig_yoy", "fig_season"], "3fr 2fr"),
+]
+
+
+def bundle_dir(snapshot_id, report_dir=REPORT_DIR):
+    """Report bundle directory of ``snapshot_id`` rendered by the current code."""
+    return os.path.join(report_dir, f"{snapshot_id}-{snapshot.code_version()}")
+
+
+def report_path(snapshot_id, report_dir=REPORT_DIR):
+    """Location of the report bundle served for ``snapshot_id``."""
+    return os.path.join(bundle_dir(snapshot_id, report_dir), "report.json")
+
+
+def default_sections(data_dir):
+    """Static tables and section results of the dashboard's default view."""
+    static = analytics.load_static(data_dir)
+    owner_roles = analytics.load_owner_roles(data_dir)
+    sel_crates, d_start, d_end = analytics.default_filters(static["order_stats"])
+    if queries.ENGINE == "duckdb":
+        return static, queries.compute_sections(data_dir, sel_crates, d_start, d_end, owner_roles)
+    orders, bridge = analytics.load_orders(data_dir, *analytics.load_window(d_start, d_end))
+    view = analytics.apply_filters(orders, bridge, sel_crates, d_start, d_end)
+    return static, analytics.compute_sections(view, static, owner_roles)
+
+
+def load_figure(fig_json):
+    """
+    Rebuild a figure serialized by ``render_report``. Validation is skipped:
+    it would coerce numeric ``text`` arrays to strings and break the
+    ``texttemplate`` number formats of the live charts.
+    """
+    import plotly.graph_objects as go
+
+    return go.Figure(json.loads(fig_json), _validate=False)
+
+
+def _write_png(fig_json, path):
+    # Runs in a worker process: the figure arrives as JSON, template included
+    fig = load_figure(fig_json)
+    fig.write_image(path, width=1400, height=fig.layout.height or 500, scale=2)
+
+
+def _render_page(version, cards, divs):
+    from plotly.offline import get_plotlyjs_version
+
+    body = []
+    for block in LAYOUT:
+        kind = block[0]
+        if kind == "section":
+            body.append('<hr>')
+            body.append(f'<p class="section-header">{block[1]}</p>')
+            body.append(f'<p class="section-sub">{block[2]}</p>')
+        elif kind == "sub":
+            body.append(f'<p class="section-sub">{block[1]}</p>')
+        elif kind == "row":
+            cells = "".join(f'<div class="stPlotlyChart">{divs[n]}</div>' for n in block[1])
+            body.append(f'<div class="row" style="grid-template-columns:{block[2]}">{cells}</div>')
+        elif kind == "cards":
+            items = cards[block[1]]
+            body.append(f'<div class="row" style="grid-template-columns:repeat({max(len(items), 1)}, 1fr)">'
+                        + "".join(items) + '</div>')
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>IFCO Sales Analytics — Snapshot {version}</title>
+<script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"></script>
+{theme.PAGE_CSS}
+<style>
+    body {{ background-color: #0d1117; color: #e2e8f0; margin: 0 auto; padding: 24px; max-width: 1500px; }}
+    .row {{ display: grid; gap: 16px; margin-bottom: 16px; }}
+</style>
+</head>
+<body>
+<h1>📦 IFCO Sales Analytics Dashboard</h1>
+<p style="color:#94a3b8; font-size:0.95rem; margin-top:-0.5rem;">Static report &middot; Snapshot {version} &middot; All crate types, full date range</p>
+{"".join(body)}
+<hr>
+<div style="text-align:center; color:#9ca3af; font-size:0.73rem">📦 IFCO Data Engineering Challenge · Test 6 · Streamlit + Plotly</div>
+</body>
+</html>
+"""
+
+
+def render_report(data_dir=DATA_DIR, report_dir=REPORT_DIR, workers=None, png=False, force=False):
+    """Render the default-view report of the current snapshot; returns the bundle path."""
+    version = snapshot.version_id(data_dir)
+    bundle_path = report_path(version, report_dir)
+    if os.path.exists(bundle_path) and not force:
+        print(f"Report for snapshot {version} already exists: {bundle_path}")
+        return bundle_path
+
+    # Plotly Express is only needed to build figures, not to serve them
+    import charts
+    import plotly.io as pio
+
+    t0 = time.perf_counter()
+    static, sections = default_sections(data_dir)
+    figs = charts.build_figures(sections, static["commissions"])
+    fig_json = {name: fig.to_json() for name, fig in figs.items()}
+    cards = theme.build_cards(sections)
+
+    out_dir = bundle_dir(version, report_dir)
+    png_dir = os.path.join(out_dir, "png") if png else None
+    os.makedirs(png_dir or out_dir, exist_ok=True)
+
+    # HTML divs are cheap to render in-process; kaleido's PNG export is not
+    divs = {name: pio.to_html(fig, full_html=False, include_plotlyjs=False, div_id=name,
+                              config={"displaylogo": False})
+            for name, fig in figs.items()}
+    if png_dir:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_write_png, fig_json.values(),
+                          [os.path.join(png_dir, f"{name}.png") for name in fig_json]))
+
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as fh:
+        fh.write(_render_page(version, cards, divs))
+
+    # Written last and atomically: the live app only serves complete bundles
+    bundle = {
+        "snapshot": version,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "figures": fig_json,
+        "cards": cards,
+    }
+    tmp_path = bundle_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(bundle, fh)
+    os.replace(tmp_path, bundle_path)
+
+    print(f"Rendered {len(figs)} figures for snapshot {version} in "
+          f"{time.perf_counter() - t0:.1f}s -> {out_dir}")
+    return bundle_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render the default dashboard view as a static report.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Snapshot directory (default: dashboard/data)")
+    parser.add_argument("--out", default=REPORT_DIR, help="Report root directory (default: dashboard/reports)")
+    parser.add_argument("--workers", type=int, default=None, help="PNG export processes (default: CPU count)")
+    parser.add_argument("--png", action="store_true", help="Also export PNGs (requires kaleido)")
+    parser.add_argument("--force", action="store_true", help="Re-render even if the report exists")
+    args = parser.parse_args()
+    render_report(args.data_dir, args.out, args.workers, args.png, args.force)
@@ -0,0 +1,260 @@
+"""
+IFCO Data Engineering Challenge — Snapshot Reader
+=================================================
+Resolves the tables exported by the notebook's "Final Data Export" cell.
+
+Two layouts are supported inside the data directory:
+
+* **Published snapshot** — a ``CURRENT`` pointer file naming a version
+  directory that holds one Parquet folder per table plus ``manifest.json``
+  (row counts, schemas, checksums). Order-level tables are split in month
+  partitions whose min/max dates are recorded in the manifest, and carry
+  the typed ``order_date`` next to the Silver ``dd.MM.yy`` date strings.
+* **Legacy CSVs** — one ``<table>.csv`` file per table, whose dates are
+  parsed from the strings.
+"""
+
+import functools
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Month partitions kept in memory, shared by every session of the process
+PARTITION_CACHE_SIZE = int(os.environ.get("IFCO_PARTITION_CACHE_SIZE", "64"))
+# Artifacts derived at image build time by ``precompute.py``
+PRECOMPUTED_DIR = os.environ.get(
+    "IFCO_PRECOMPUTED_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "precomputed")
+)
+# Format of the order dates written by the Silver layer ('dd.MM.yy' in Spark)
+DATE_FORMAT = "%d.%m.%y"
+# Published snapshots also carry the Silver layer's typed order date, read in
+# place of the date strings; only legacy CSVs have the strings parsed
+TYPED_DATE_COLUMNS = {"date": "order_date"}
+# Oldest manifest format read (format 1 exports lack the typed order dates,
+# format 2 ones store the sketches as sparse register rows)
+MANIFEST_FORMAT = 3
+
+
+def current_version_dir(data_dir):
+    """Return the published snapshot directory, or None for the CSV layout."""
+    pointer = os.path.join(data_dir, "CURRENT")
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as fh:
+        return os.path.join(data_dir, fh.read().strip())
+
+
+@functools.lru_cache(maxsize=4)
+def _load_manifest(version_dir):
+    # Versions are immutable once published, so the parsed manifest is cached
+    with open(os.path.join(version_dir, "manifest.json")) as fh:
+        manifest = json.load(fh)
+    if manifest["format"] < MANIFEST_FORMAT:
+        raise ValueError(
+            f"Snapshot '{version_dir}' has manifest format {manifest['format']}, "
+            f"expected {MANIFEST_FORMAT} or later: re-run the notebook export"
+        )
+    return manifest
+
+
+def read_manifest(data_dir):
+    """Return the manifest of the published snapshot, or None for the CSV layout."""
+    version_dir = current_version_dir(data_dir)
+    if version_dir is None:
+        return None
+    return _load_manifest(version_dir)
+
+
+@functools.lru_cache(maxsize=64)
+def _file_digest(path, size, mtime_ns):
+    # Keyed by the file's stat, so unchanged files are hashed once per process
+    digest = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(8 * 1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def version_id(data_dir):
+    """
+    Identifier of the snapshot contents: the manifest version, or for legacy
+    CSVs a fingerprint of their names and bytes (a copy or ``touch`` keeps it).
+    """
+    manifest = read_manifest(data_dir)
+    if manifest is not None:
+        return manifest["version"]
+    digest = hashlib.sha1()
+    for f in sorted(os.listdir(data_dir)):
+        if f.endswith(".csv"):
+            path = os.path.join(data_dir, f)
+            stat = os.stat(path)
+            digest.update(f"{f}:{_file_digest(path, stat.st_size, stat.st_mtime_ns)}".encode())
+    return f"csv-{digest.hexdigest()[:12]}"
+
+
+@functools.lru_cache(maxsize=1)
+def code_version():
+    """
+    Fingerprint of the dashboard's source files. Artifacts derived from a
+    snapshot (its Parquet conversion, the pre-rendered report) are keyed by
+    it too, so they are rebuilt instead of served stale after a code change.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    for f in sorted(os.listdir(here)):
+        if f.endswith(".py"):
+            with open(os.path.join(here, f), "rb") as fh:
+                digest.update(f.encode() + b"\0" + fh.read())
+    return digest.hexdigest()[:8]
+
+
+def converted_dir(data_dir, precomputed_dir):
+    """Where ``precompute.py`` writes the Parquet conversion of a legacy CSV snapshot."""
+    return os.path.join(precomputed_dir, "snapshots", f"{version_id(data_dir)}-{code_version()}")
+
+
+def resolve_data_dir(data_dir, precomputed_dir=PRECOMPUTED_DIR):
+    """
+    The data directory to serve: the precomputed Parquet conversion of a
+    legacy CSV snapshot when one exists for exactly these CSVs, else
+    ``data_dir`` itself.
+    """
+    if precomputed_dir and current_version_dir(data_dir) is None:
+        converted = converted_dir(data_dir, precomputed_dir)
+        if os.path.exists(os.path.join(converted, "CURRENT")):
+            return converted
+    return data_dir
+
+
+def has_table(data_dir, name):
+    """True when the snapshot in ``data_dir`` contains table ``name``."""
+    manifest = read_manifest(data_dir)
+    if manifest is None:
+        return os.path.exists(os.path.join(data_dir, f"{name}.csv"))
+    return name in manifest["tables"]
+
+
+def _parse_dates(df, parse_dates):
+    # Legacy CSVs only: Parquet tables are read with ``_read_parquet``
+    for col in parse_dates:
+        if not pd.api.types.is_datetime64_any_dtype(df[col]):
+            # Explicit format: one vectorized parse, no per-value inference.
+            # Invalid dates become NaT, like the Silver layer's null order_date.
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors="coerce")
+    return df
+
+
+def _read_parquet(path, parse_dates, columns=None):
+    # ``parse_dates`` columns are filled from their typed date column, as datetime64
+    typed = {TYPED_DATE_COLUMNS[col]: col for col in parse_dates}
+    read_columns = None
+    if columns:
+        read_columns = [TYPED_DATE_COLUMNS[c] if c in parse_dates else c for c in columns]
+    df = pq.read_table(path, columns=read_columns).to_pandas(date_as_object=False)
+    for typed_col, col in typed.items():
+        df[col] = df.pop(typed_col).astype("datetime64[ns]")
+    return df[list(columns)] if columns else df
+
+
+def read_table(data_dir, name, parse_dates=None):
+    """
+    Load one exported table as a DataFrame.
+
+    ``parse_dates`` columns hold dates: the typed ``order_date`` of a
+    published snapshot, or legacy CSV strings parsed with ``DATE_FORMAT``,
+    the ``dd.MM.yy`` format written by the Silver layer.
+    """
+    version_dir = current_version_dir(data_dir)
+    if version_dir is None:
+        return _parse_dates(pd.read_csv(os.path.join(data_dir, f"{name}.csv")), parse_dates or [])
+
+    entry = read_manifest(data_dir)["tables"][name]
+    df = _read_parquet(os.path.join(version_dir, entry["path"]), parse_dates or [])
+    # A partially copied snapshot must fail loudly instead of showing wrong totals
+    if len(df) != entry["rows"]:
+        raise ValueError(
+            f"Snapshot table '{name}' has {len(df)} rows, manifest expects {entry['rows']}"
+        )
+    return df
+
+
+@functools.lru_cache(maxsize=PARTITION_CACHE_SIZE)
+def _read_partition(path, rows, parse_dates, columns=None):
+    # Cached frames are shared between callers: treat them as read-only
+    df = _read_parquet(path, parse_dates, columns)
+    if len(df) != rows:
+        raise ValueError(f"Partition '{path}' has {len(df)} rows, manifest expects {rows}")
+    return df
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_legacy_csv(path, size, mtime_ns, parse_dates):
+    # Keyed by the file's stat: a replaced CSV is read again, not served stale
+    return _parse_dates(pd.read_csv(path), parse_dates)
+
+
+def _read_legacy_csv(path, parse_dates):
+    stat = os.stat(path)
+    return _parse_legacy_csv(path, stat.st_size, stat.st_mtime_ns, parse_dates)
+
+
+def table_stats(data_dir, name, date_col="date"):
+    """
+    Date bounds and crate types of an order-level table, answered from the
+    manifest partition statistics without reading any rows.
+    """
+    manifest = read_manifest(data_dir)
+    if manifest is None:
+        df = _read_legacy_csv(os.path.join(data_dir, f"{name}.csv"), (date_col,))
+        return {
+            "min_date": df[date_col].min(),
+            "max_date": df[date_col].max(),
+            "crate_types": sorted(df["crate_type"].dropna().unique()),
+        }
+
+    parts = [p for p in manifest["tables"][name]["partitions"] if p["min_date"]]
+    return {
+        "min_date": min(pd.Timestamp(p["min_date"]) for p in parts),
+        "max_date": max(pd.Timestamp(p["max_date"]) for p in parts),
+        "crate_types": sorted({c for p in parts for c in p["crate_types"]}),
+    }
+
+
+def load_range(data_dir, name, start, end, parse_dates=None, columns=None):
+    """
+    Load the month partitions of ``name`` whose [min_date, max_date] overlaps
+    [start, end], optionally only ``columns``. Rows inside a loaded partition
+    are not filtered, so callers still apply their exact date masks.
+
+    Legacy CSV snapshots have no partitions: the whole table is returned.
+    Like the cached partitions, the result must be treated as read-only.
+    """
+    parse_dates = tuple(parse_dates or ())
+    columns = tuple(columns) if columns else None
+    version_dir = current_version_dir(data_dir)
+    if version_dir is None:
+        df = _read_legacy_csv(os.path.join(data_dir, f"{name}.csv"), parse_dates)
+        return df[list(columns)] if columns else df
+
+    entry = read_manifest(data_dir)["tables"][name]
+    table_dir = os.path.join(version_dir, entry["path"])
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    selected = [
+        p for p in entry["partitions"]
+        # Undated rows can never match a date range
+        if p["min_date"] and pd.Timestamp(p["max_date"]) >= start and pd.Timestamp(p["min_date"]) <= end
+    ]
+    if not selected:
+        typed = {TYPED_DATE_COLUMNS[col] for col in parse_dates}
+        columns = columns or [f["name"] for f in entry["schema"]["fields"]
+                              if f["name"] != entry["partition_by"] and f["name"] not in typed]
+        return pd.DataFrame(columns=list(columns)).astype({col: "datetime64[ns]" for col in parse_dates})
+
+    return pd.concat(
+        [_read_partition(os.path.join(table_dir, p["path"]), p["rows"], parse_dates, columns)
+         for p in selected],
+        ignore_index=True,
+    )
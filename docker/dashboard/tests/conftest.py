@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# The dashboard modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+@pytest.fixture(scope="session")
+def published_dir(tmp_path_factory):
+    """The bundled legacy CSVs converted to a published, month-partitioned snapshot."""
+    import precompute
+    return precompute.convert_legacy(DATA_DIR, str(tmp_path_factory.mktemp("precomputed")))
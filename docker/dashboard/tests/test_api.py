@@ -0,0 +1,110 @@
+"""Error handling, conditional requests and compression of the aggregates API."""
+
+import gzip
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import api
+
+
+def failing_endpoint(data_dir, filters):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setitem(api.ENDPOINTS, "/api/v1/failing", (failing_endpoint, []))
+    server = api.make_server("127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path):
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    try:
+        with urllib.request.urlopen(url, timeout=30) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+def fetch(server, path, headers=None):
+    # Status, headers and raw body, for the conditional and gzip paths
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as resp:
+            return resp.status, resp.headers, resp.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.headers, exc.read()
+
+
+def test_failing_endpoint_answers_500(server):
+    # Twice: a failed computation must neither be cached nor block the key
+    for _ in range(2):
+        status, body = get(server, "/api/v1/failing")
+        assert status == 500
+        assert "error" in body
+    assert server.cache._pending == {}
+    assert get(server, "/api/v1/snapshot")[0] == 200
+
+
+def test_cache_releases_pending_key_on_failure():
+    cache = api.ResponseCache()
+    with pytest.raises(RuntimeError):
+        cache.get("key", lambda: failing_endpoint(None, None))
+    assert cache._pending == {}
+    assert cache.get("key", lambda: "entry") == "entry"
+
+
+def test_code_version_change_invalidates_etag(server, monkeypatch):
+    status, headers, _ = fetch(server, "/api/v1/snapshot")
+    assert status == 200
+    tag = headers["ETag"]
+    assert fetch(server, "/api/v1/snapshot", {"If-None-Match": tag})[0] == 304
+
+    # Same snapshot, new dashboard code: the old tag must not validate
+    monkeypatch.setattr(api.snapshot, "code_version", lambda: "deployed")
+    status, headers, _ = fetch(server, "/api/v1/snapshot", {"If-None-Match": tag})
+    assert status == 200
+    assert headers["ETag"] != tag
+
+
+def test_not_modified(server):
+    path = "/api/v1/crate-distribution?crates=Plastic"
+    status, headers, _ = fetch(server, path)
+    assert status == 200
+    tag = headers["ETag"]
+
+    # Any listed tag, the strong form (weak comparison) or * revalidates
+    for if_none_match in (tag, f'W/"other", {tag}', tag.removeprefix("W/"), "*"):
+        status, headers, body = fetch(server, path, {"If-None-Match": if_none_match})
+        assert status == 304 and body == b""
+        assert headers["ETag"] == tag
+
+    # Another filter is another representation
+    status, headers, _ = fetch(server, "/api/v1/crate-distribution?crates=Wood", {"If-None-Match": tag})
+    assert status == 200 and headers["ETag"] != tag
+
+
+def test_gzip_encoding(server):
+    path = "/api/v1/crate-distribution"
+    status, headers, identity = fetch(server, path)
+    assert status == 200 and "Content-Encoding" not in headers
+    assert len(identity) >= api.GZIP_MIN_BYTES
+
+    status, headers, body = fetch(server, path, {"Accept-Encoding": "br, gzip;q=0.8"})
+    assert status == 200 and headers["Content-Encoding"] == "gzip"
+    assert headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(body) == identity
+    assert int(headers["Content-Length"]) == len(body) < len(identity)
+
+    status, headers, body = fetch(server, path, {"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in headers and body == identity
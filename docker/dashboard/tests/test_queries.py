@@ -0,0 +1,21 @@
+"""DuckDB views over snapshot paths that need SQL escaping."""
+
+import os
+import shutil
+
+import pytest
+
+import analytics
+import queries
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(queries.__file__)), "data")
+
+pytestmark = pytest.mark.skipif(queries.duckdb is None, reason="DuckDB is not installed")
+
+
+def test_data_dir_with_quote(tmp_path):
+    data_dir = str(tmp_path / "it's data")
+    shutil.copytree(DATA_DIR, data_dir)
+    static = analytics.load_static(data_dir)
+    params = queries.filter_params(*analytics.default_filters(static["order_stats"]))
+    assert queries.kpis(data_dir, params) == queries.kpis(DATA_DIR, params)
@@ -0,0 +1,46 @@
+"""Section C over ranges whose rolling windows hold no plastic orders."""
+
+import datetime
+import os
+
+import pandas as pd
+import pytest
+
+import analytics
+import api
+import queries
+import snapshot
+
+DASHBOARD = os.path.join(api.HERE, "dashboard.py")
+
+# April 2022 has Metal orders only, and its window (Feb-Apr) no plastic ones
+NO_PLASTIC_RANGE = {"start": ["2022-04-01"], "end": ["2022-04-30"]}
+
+
+def test_rank_rolling_without_plastic_orders():
+    all_months = pd.period_range("2022-04", "2022-05", freq="M")
+    c = analytics.rank_rolling(lambda month: pd.Series(dtype="int64"), all_months)
+    assert c["latest_month"] is None
+    assert c["rolling_df"].empty and c["top5_latest"].empty
+    assert c["all_top_owners"] == []
+    assert list(c["pivot_full"].index) == ["2022-04", "2022-05"]
+
+
+@pytest.mark.parametrize("engine", ["pandas", "duckdb"])
+def test_api_rolling_top5_without_plastic_orders(monkeypatch, engine):
+    if engine == "duckdb" and queries.duckdb is None:
+        pytest.skip("DuckDB is not installed")
+    monkeypatch.setattr(queries, "ENGINE", engine)
+    filters = api.parse_filters(NO_PLASTIC_RANGE, snapshot.table_stats(api.DATA_DIR, "silver_orders"))
+    assert api.crate_distribution(api.DATA_DIR, filters)["overall"], "the range must hold orders"
+
+    payload = api.rolling_top5(api.DATA_DIR, filters)
+    assert payload == {"latest_month": None, "top5_latest": [], "ranking": []}
+
+
+def test_dashboard_without_plastic_orders():
+    app_test = pytest.importorskip("streamlit.testing.v1")
+    at = app_test.AppTest.from_file(DASHBOARD, default_timeout=120).run()
+    at.date_input[0].set_value((datetime.date(2022, 4, 1), datetime.date(2022, 4, 30))).run()
+    assert not at.exception
+    assert any("No plastic crate orders" in c.value for c in at.caption)
@@ -0,0 +1,68 @@
+"""HyperLogLog sketches: error bounds of the merged estimates."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sketches
+
+PRECISION = sketches.DEFAULT_PRECISION
+
+
+def synthetic_orders(cardinalities, months=3, seed=0):
+    """Exploded orders with a known number of distinct orders per salesowner."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for owner, distinct in cardinalities.items():
+        ids = np.char.add(f"{owner}-", np.arange(distinct).astype(str))
+        frames.append(pd.DataFrame({
+            # Every order once per month, so merging the months must not inflate the count
+            "order_id":   np.tile(ids, months),
+            "date":       pd.to_datetime(np.repeat([f"2024-{m + 1:02d}-15" for m in range(months)], distinct)),
+            "crate_type": rng.choice(["Plastic", "Wood"], distinct * months),
+            "salesowner": owner,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_relative_error():
+    assert sketches.relative_error(12) == pytest.approx(0.01625)
+    assert sketches.relative_error(14) == pytest.approx(sketches.relative_error(12) / 2)
+
+
+def test_estimate_within_error_bounds():
+    cardinalities = {"small": 10, "linear": 2_000, "medium": 20_000, "large": 200_000}
+    sketch = sketches.build(synthetic_orders(cardinalities), PRECISION)
+    # At most one fixed-size sketch per owner × month × crate type, whatever the volume
+    assert len(sketch["keys"]) <= len(cardinalities) * 3 * 2
+    assert sketch["registers"].shape == (len(sketch["keys"]), 2 ** PRECISION)
+
+    estimates = sketches.estimate(sketch, ["salesowner"], PRECISION)
+    for owner, distinct in cardinalities.items():
+        # Three standard errors; small counts are exact under linear counting
+        assert estimates[owner] == pytest.approx(distinct, rel=3 * sketches.relative_error(PRECISION), abs=1)
+
+
+def test_estimate_merges_selected_months():
+    orders = synthetic_orders({"owner": 5_000}, months=3)
+    # A month of its own orders on top, counted only when that month is selected
+    extra = orders.iloc[:3_000].assign(order_id=lambda df: "x" + df["order_id"], date=pd.Timestamp("2024-04-15"))
+    sketch = sketches.build(pd.concat([orders, extra], ignore_index=True), PRECISION)
+    bound = 3 * sketches.relative_error(PRECISION)
+
+    months = sketch["keys"]["order_month"]
+    first3 = sketches.estimate(sketches.select(sketch, months <= "2024-03"), ["salesowner"], PRECISION)
+    all4 = sketches.estimate(sketch, ["salesowner"], PRECISION)
+    assert first3["owner"] == pytest.approx(5_000, rel=bound)
+    assert all4["owner"] == pytest.approx(8_000, rel=bound)
+
+
+def test_table_round_trip():
+    sketch = sketches.build(synthetic_orders({"a": 100, "b": 300}), PRECISION)
+    table = sketches.to_table(sketch)
+    assert len(table) == len(sketch["keys"])
+    assert table["registers"].map(len).eq(2 ** PRECISION).all()
+
+    restored = sketches.from_table(table, PRECISION)
+    pd.testing.assert_frame_equal(restored["keys"], sketch["keys"])
+    np.testing.assert_array_equal(restored["registers"], sketch["registers"])
@@ -0,0 +1,228 @@
+"""
+IFCO Data Engineering Challenge — Dashboard Theme
+=================================================
+Plotly template, page CSS, the ``dark()`` figure helper and the HTML cards
+shared by the Streamlit app and the static report. Importing it does not
+import Plotly.
+"""
+
+# ── Register a fully custom Plotly template ──────────────────────────────────
+# This is the reliable way to guarantee ALL text (axes, legends, titles,
+# annotations, hover labels, colorbars) is light on dark backgrounds.
+BG       = "#1a2030"      # chart area & paper
+GRID     = "#2a3347"
+TEXT     = "#e2e8f0"      # all chart text — bright enough for dark BG
+TITLE_C  = "#e2e8f0"      # chart titles — same as TEXT for maximum contrast
+
+
+def register_template():
+    """
+    Register "ifco_dark" as the default Plotly template. Called when
+    ``charts`` is imported: pre-rendered figures embed the template already,
+    so serving them never builds it.
+    """
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    pio.templates["ifco_dark"] = go.layout.Template(
+        layout=go.Layout(
+            paper_bgcolor=BG,
+            plot_bgcolor=BG,
+            font=dict(color=TEXT, size=12),
+            title=dict(font=dict(color=TITLE_C, size=15), x=0.05),
+            legend=dict(
+                font=dict(color=TEXT, size=11),
+                bgcolor="rgba(0,0,0,0)",
+                bordercolor=GRID,
+            ),
+            xaxis=dict(
+                gridcolor=GRID, zerolinecolor=GRID,
+                tickfont=dict(color=TEXT),
+                title=dict(font=dict(color=TEXT)),
+                linecolor=GRID,
+            ),
+            yaxis=dict(
+                gridcolor=GRID, zerolinecolor=GRID,
+                tickfont=dict(color=TEXT),
+                title=dict(font=dict(color=TEXT)),
+                linecolor=GRID,
+            ),
+            polar=dict(
+                bgcolor=BG,
+                angularaxis=dict(gridcolor=GRID, linecolor=GRID, tickfont=dict(color=TEXT)),
+                radialaxis=dict(gridcolor=GRID, linecolor=GRID, tickfont=dict(color=TEXT)),
+            ),
+            coloraxis=dict(
+                colorbar=dict(
+                    tickfont=dict(color=TEXT),
+                    title=dict(font=dict(color=TEXT)),
+                    outlinecolor=GRID,
+                )
+            ),
+            geo=dict(bgcolor=BG, lakecolor=GRID, landcolor="#2d3748"),
+            hoverlabel=dict(bgcolor="#2d3748", font=dict(color=TEXT)),
+            annotationdefaults=dict(font=dict(color=TEXT)),
+        )
+    )
+    pio.templates.default = "ifco_dark"
+
+CRATE_COLORS = {"Plastic": "#3b82f6", "Wood": "#22c55e", "Metal": "#f59e0b"}
+
+# ── Custom CSS ────────────────────────────────────────────────────────────────
+PAGE_CSS = """
+<style>
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
+
+    * { font-family: 'Inter', sans-serif; }
+    .stApp { background-color: #0d1117; }
+    [data-testid="stSidebar"] { background-color: #161b22; border-right: 1px solid #2a3347; }
+
+    /* Hide the white Streamlit top toolbar/header */
+    [data-testid="stToolbar"] { display: none !important; }
+    [data-testid="stHeader"] { background: transparent !important; height: 0 !important; }
+    .stDeployButton { display: none !important; }
+    #MainMenu { visibility: hidden; }
+
+    /* Sidebar text — labels, captions, markdown */
+    [data-testid="stSidebar"] label,
+    [data-testid="stSidebar"] p,
+    [data-testid="stSidebar"] .stCaption,
+    [data-testid="stSidebar"] small,
+    [data-testid="stSidebar"] span:not([data-baseweb]) {
+        color: #cbd5e1 !important;
+    }
+    [data-testid="stSidebar"] h1,
+    [data-testid="stSidebar"] h2,
+    [data-testid="stSidebar"] h3 { color: #e2e8f0 !important; }
+
+    /* Main page title visibility */
+    h1, h2, h3, h4 { color: #e2e8f0 !important; }
+
+    /* st.caption visibility */
+    [data-testid="stCaptionContainer"] p,
+    .stCaption, small { color: #94a3b8 !important; }
+
+    /* KPI cards */
+    .kpi-card {
+        background: linear-gradient(135deg, #1a2030 0%, #1e2a3d 100%);
+        border: 1px solid #2a3347;
+        border-radius: 12px;
+        padding: 20px 24px;
+        text-align: center;
+        box-shadow: 0 4px 20px rgba(0,0,0,0.5);
+        transition: transform 0.2s;
+    }
+    .kpi-card:hover { transform: translateY(-2px); }
+    .kpi-value { font-size: 2.1rem; font-weight: 700; color: #60a5fa; margin: 0; }
+    .kpi-label { font-size: 0.72rem; color: #6b7280; text-transform: uppercase;
+                 letter-spacing: 0.1em; margin-top: 4px; }
+    .kpi-delta { font-size: 0.8rem; color: #34d399; margin-top: 2px; }
+
+    /* Section headers */
+    .section-header {
+        background: linear-gradient(90deg, #60a5fa 0%, #93c5fd 100%);
+        -webkit-background-clip: text; -webkit-text-fill-color: transparent;
+        font-size: 1.3rem; font-weight: 700; margin-bottom: 0.15rem;
+        padding-left: 4px;
+    }
+    .section-sub { color: #94a3b8; font-size: 0.82rem; margin-bottom: 1rem; padding-left: 4px; }
+
+    hr { border-color: #1f2937 !important; margin: 1.8rem 0; }
+    .stPlotlyChart { border-radius: 10px; overflow: hidden;
+                     border: 1px solid #1f2937; }
+    [data-testid="stExpander"] { background: #161b22; border: 1px solid #1f2937; border-radius: 8px; }
+
+    /* Streamlit tabs — make unselected tabs clearly readable */
+    button[data-baseweb="tab"] { color: #9ca3af !important; font-weight: 500; }
+    button[data-baseweb="tab"][aria-selected="true"] { color: #e2e8f0 !important; font-weight: 700; }
+    [data-testid="stTabBar"] { border-bottom: 1px solid #2a3347; }
+</style>
+"""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HELPER — apply consistent dark styling to any go.Figure
+# ─────────────────────────────────────────────────────────────────────────────
+def dark(fig, height=None, margin=None, legend_h=False):
+    """Apply unified dark-mode overrides to any Plotly figure."""
+    leg = dict(font=dict(color=TEXT, size=11), bgcolor="rgba(0,0,0,0)")
+    if legend_h:
+        leg.update(orientation="h", y=-0.18)
+    upd = dict(
+        paper_bgcolor=BG, plot_bgcolor=BG,
+        font=dict(color=TEXT, size=12),
+        title_font=dict(color=TITLE_C, size=16),
+        title_x=0.05,
+        legend=leg,
+        margin=margin or dict(t=70, b=45, l=20, r=20),
+    )
+    if height:
+        upd["height"] = height
+    fig.update_layout(**upd)
+    # Force all axis text to be light too
+    fig.update_xaxes(tickfont_color=TEXT, title_font_color=TEXT, gridcolor=GRID, zerolinecolor=GRID)
+    fig.update_yaxes(tickfont_color=TEXT, title_font_color=TEXT, gridcolor=GRID, zerolinecolor=GRID)
+    return fig
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HTML CARDS
+# ─────────────────────────────────────────────────────────────────────────────
+def kpi_card(val, label, delta=""):
+    d_html = f'<p class="kpi-delta">{delta}</p>' if delta else ""
+    return f"""
+        <div class="kpi-card">
+            <p class="kpi-value">{val}</p>
+            <p class="kpi-label">{label}</p>
+            {d_html}
+        </div>"""
+
+
+def kpi_cards(k):
+    """The five header KPI cards, in display order."""
+    return [
+        kpi_card(val, label, delta)
+        for val, label, delta in zip(
+            [f"{k['total_orders']:,}", f"{k['plastic_pct']:.1f}%", f"€{k['total_commission']:,.2f}",
+             str(k["active_owners"]), str(k["active_companies"])],
+            ["Total Orders", "Plastic Share", "Total Commissions", "Active Sales Owners", "Companies Served"],
+            ["", "of total orders", "all time", f"all time · {k['range_owners']} in selected range",
+             "in selected range"]
+        )
+    ]
+
+
+def training_card(row):
+    rate  = row["plastic_rate"]
+    color = "#ef4444" if rate < 20 else "#f59e0b" if rate < 40 else "#22c55e"
+    return f"""
+        <div class="kpi-card" style="border-color:{color}60">
+            <p class="kpi-value" style="color:{color}">{rate:.1f}%</p>
+            <p class="kpi-label">{row['salesowner']}</p>
+            <p class="kpi-delta" style="color:#6b7280">{int(row['plastic'])}/{int(row['total'])} plastic orders</p>
+        </div>"""
+
+
+MEDALS = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
+
+
+def medal_card(row, latest_month):
+    medal = MEDALS[int(row["rank"]) - 1]
+    clr = {"🥇":"#f59e0b","🥈":"#94a3b8","🥉":"#b45309"}.get(medal, "#3b82f6")
+    return f"""
+        <div class="kpi-card" style="border-color:{clr}50">
+            <p class="kpi-value" style="color:{clr};font-size:1.6rem">{medal}</p>
+            <p class="kpi-label">{row['salesowner']}</p>
+            <p class="kpi-delta">{int(row['plastic_orders'])} orders · window ending {latest_month}</p>
+        </div>"""
+
+
+def build_cards(sections):
+    """HTML of every card row for one set of ``analytics.compute_sections`` results."""
+    c = sections["c"]
+    return {
+        "kpis":     kpi_cards(sections["kpis"]),
+        # Highest training priority (lowest plastic %)
+        "training": [training_card(row) for _, row in sections["b"].head(3).iterrows()],
+        "medals":   [medal_card(row, c["latest_month"]) for _, row in c["top5_latest"].iterrows()],
+    }